@@ -6,6 +6,7 @@ Contém:
     - handlers.py: Handlers de comandos e mensagens do Telegram
     - transcription.py: Integração com API Whisper (máxima precisão)
     - audio_processor.py: Download, conversão e validação de áudio
+    - metrics.py: Contadores e latências expostos em /metrics
     - utils.py: Funções auxiliares compartilhadas
 
 Uso:
@@ -5,13 +5,14 @@ Responsável por todo o pipeline de preparação do áudio antes
 de enviar para a API Whisper:
 
     1. Validação (tamanho, formato)
-    2. Download do Telegram
-    3. Conversão para formato compatível (se necessário)
+    2. Download do Telegram direto para a memória
+    3. Conversão para formato compatível (se necessário), com os
+       bytes entrando pelo stdin do ffmpeg e saindo pelo stdout
 
-A API Whisper aceita: mp3, mp4, mpeg, mpga, m4a, wav, webm.
-Porém, o Telegram envia voice messages em formato .ogg (Opus codec).
-Para máxima compatibilidade, convertemos tudo para MP3 mono 16kHz,
-que é o formato ideal para speech-to-text.
+A API Whisper aceita: mp3, mp4, mpeg, mpga, m4a, wav, webm, ogg, flac.
+Esses formatos são enviados sem conversão — inclusive o .ogg (Opus)
+das voice messages do Telegram, o caso mais comum. Os demais
+(ex: aac, wma, amr) são convertidos para MP3 mono 16kHz.
 
 Dependência externa: FFmpeg
     - Local: instalar via apt/brew/choco
@@ -19,16 +20,23 @@ Dependência externa: FFmpeg
 
 Uso:
     from bot.audio_processor import download_and_prepare_audio, validate_audio_size
+
+    audio = await download_and_prepare_audio(telegram_file, "voz.ogg")
+    result = await transcribe_audio(audio)  # audio.data, audio.filename
 """
 
+import asyncio
+import functools
 import logging
 import os
+import re
+import shutil
+import subprocess
+from dataclasses import dataclass
 from pathlib import Path
 
-from pydub import AudioSegment
-
-from bot.utils import cleanup_file, format_file_size, get_temp_filepath
-from config.settings import settings
+from bot.utils import cleanup_file, format_file_size, write_temp_file
+from config.settings import MAX_AUDIO_SIZE_BYTES, settings
 
 logger = logging.getLogger(__name__)
 
@@ -38,16 +46,78 @@ logger = logging.getLogger(__name__)
 # ============================================================
 # Referência: https://platform.openai.com/docs/guides/speech-to-text
 # ============================================================
-SUPPORTED_FORMATS: set[str] = {
+SUPPORTED_FORMATS: frozenset[str] = frozenset({
     "mp3", "mp4", "mpeg", "mpga", "m4a",
     "wav", "webm", "ogg", "oga", "flac",
     "aac", "opus", "wma", "amr",
-}
+})
 
-# Formatos que o Whisper aceita diretamente (não precisa converter)
-WHISPER_NATIVE_FORMATS: set[str] = {
+# Formatos que o Whisper aceita diretamente (não precisa converter).
+# Inclui OGG/Opus: voice messages do Telegram vão direto para a API,
+# sem nenhuma passada de ffmpeg.
+WHISPER_NATIVE_FORMATS: frozenset[str] = frozenset({
     "mp3", "mp4", "mpeg", "mpga", "m4a", "wav", "webm",
-}
+    "ogg", "oga", "opus", "flac",
+})
+
+# Nome usado para voice messages, que chegam sem nome de arquivo mas
+# são sempre OGG/Opus. Qualquer outro áudio sem nome tem formato
+# desconhecido e passa pelo ffmpeg (ver download_and_prepare_audio).
+VOICE_MESSAGE_FILENAME = "voice.ogg"
+
+# Extensão usada no arquivo enviado ao Whisper quando difere da original.
+# A API identifica o formato pela extensão: ".opus" é um container Ogg,
+# mas só ".ogg"/".oga" são reconhecidos.
+UPLOAD_EXTENSIONS: dict[str, str] = {"opus": "ogg"}
+
+# Formatos que não podem ser lidos pelo stdin do ffmpeg/ffprobe: MP4/M4A
+# costumam ter o índice (moov atom) no fim do arquivo e exigem seek,
+# então passam pelo disco antes da validação/conversão.
+PIPE_UNSAFE_FORMATS: frozenset[str] = frozenset({"mp4", "m4a"})
+
+# Qualquer coisa que não seja alfanumérico ASCII é removida da extensão
+_EXT_UNSAFE_CHARS = re.compile(r"[^a-z0-9]")
+
+# Binários do FFmpeg resolvidos uma única vez no import, para não
+# refazer a busca no PATH a cada subprocesso. Se não estiverem no PATH,
+# usa o nome puro e o erro aparece na primeira chamada.
+FFMPEG_BIN = shutil.which("ffmpeg") or "ffmpeg"
+FFPROBE_BIN = shutil.which("ffprobe") or "ffprobe"
+
+# Limita conversões simultâneas ao número de CPUs: cada ffmpeg roda
+# com -threads 1, então N conversões ocupam no máximo N núcleos
+# (evita thrashing/OOM em instâncias pequenas sob rajadas de áudio)
+_FFMPEG_SEMAPHORE = asyncio.Semaphore(max(1, os.cpu_count() or 2))
+
+# Timeout do ffprobe (segundos) — só lê o cabeçalho, deve ser instantâneo
+FFPROBE_TIMEOUT = 5
+
+# Filtro aplicado na conversão: toda pausa com mais de 1s abaixo de
+# -50dB é encurtada para 0.5s. Conservador de propósito — limiar baixo
+# para não cortar fala baixa, e sem highpass/lowpass, que tiram
+# informação útil ao Whisper (consoantes ficam acima de 3kHz).
+SILENCE_FILTER = (
+    "silenceremove=stop_periods=-1:stop_duration=1"
+    ":stop_threshold=-50dB:stop_silence=0.5"
+)
+
+
+@dataclass
+class PreparedAudio:
+    """
+    Áudio pronto para envio ao Whisper, mantido em memória.
+
+    Atributos:
+        data: Conteúdo do arquivo de áudio.
+        filename: Nome usado no upload (a API detecta o formato
+                  pela extensão, ex: "audio.mp3", "audio.ogg").
+        duration: Duração original em segundos, quando conhecida
+                  (o Telegram informa para voz e áudio); 0 se não.
+    """
+
+    data: bytes
+    filename: str
+    duration: float = 0.0
 
 
 class AudioValidationError(Exception):
@@ -79,9 +149,7 @@ def validate_audio_size(file_size: int) -> None:
     Raises:
         AudioValidationError: Se o arquivo excede o limite.
     """
-    max_size = settings.max_audio_size_bytes
-
-    if file_size > max_size:
+    if file_size > MAX_AUDIO_SIZE_BYTES:
         size_str = format_file_size(file_size)
         max_str = f"{settings.MAX_AUDIO_SIZE_MB}MB"
         raise AudioValidationError(
@@ -91,11 +159,15 @@ def validate_audio_size(file_size: int) -> None:
         )
 
 
+@functools.lru_cache(maxsize=128)
 def _get_file_extension(file_path: str) -> str:
     """
     Extrai a extensão do arquivo (sem o ponto, lowercase).
     Aplica sanitização básica para evitar caracteres maliciosos.
 
+    Resultado memoizado: poucos nomes/extensões cobrem quase
+    todos os uploads (ex: "audio.ogg", "voice.mp3").
+
     Args:
         file_path: Caminho ou nome do arquivo.
 
@@ -105,81 +177,174 @@ def _get_file_extension(file_path: str) -> str:
     # Remove qualquer tentativa de path traversal ou caracteres estranhos
     safe_name = os.path.basename(file_path)
     ext = Path(safe_name).suffix.lstrip(".").lower()
-    
-    # Filtra apenas caracteres alfanuméricos simples
-    return "".join(c for c in ext if c.isalnum())
+
+    # Filtra apenas caracteres alfanuméricos simples (uma passada em C)
+    return _EXT_UNSAFE_CHARS.sub("", ext)
 
 
-def _needs_conversion(file_path: str) -> bool:
+def _needs_conversion(ext: str | None) -> bool:
     """
     Verifica se o arquivo precisa ser convertido.
 
-    Voice messages do Telegram vêm em .ogg (Opus codec),
-    que o Whisper aceita mas pode ter problemas.
-    Convertemos tudo para MP3 para garantir compatibilidade.
+    Formatos que o Whisper aceita diretamente (WHISPER_NATIVE_FORMATS)
+    são enviados como estão — reencodar só gasta um ffmpeg inteiro
+    e perde qualidade (lossy → lossy). Os demais viram MP3.
 
     Args:
-        file_path: Caminho do arquivo de áudio.
+        ext: Extensão já extraída por _get_file_extension (sem ponto),
+             ou None se o formato é desconhecido (sempre converte).
 
     Retorna:
         True se o arquivo precisa ser convertido para MP3.
     """
-    ext = _get_file_extension(file_path)
-    # Sempre convertemos para MP3 para máxima compatibilidade
-    # O Whisper performa melhor com MP3 mono 16kHz
-    return ext != "mp3"
+    return ext is None or ext not in WHISPER_NATIVE_FORMATS
+
+
+async def _run_ffprobe(source: str | bytes, *args: str) -> str | None:
+    """
+    Executa o ffprobe sobre um arquivo ou áudio em memória.
+
+    O ffprobe lê apenas o cabeçalho do container — não decodifica
+    o áudio, então custa milissegundos mesmo para arquivos grandes.
+    Roda como subprocesso assíncrono para não bloquear o event loop.
+
+    Args:
+        source: Caminho do arquivo, ou o conteúdo do áudio em memória
+                (enviado pelo stdin do ffprobe).
+        *args: Argumentos do ffprobe (ex: "-show_entries", "...").
+
+    Retorna:
+        Saída padrão (stdout) sem espaços nas pontas, ou None se o
+        ffprobe falhar, não existir ou exceder FFPROBE_TIMEOUT.
+    """
+    from_memory = not isinstance(source, str)
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            FFPROBE_BIN, "-v", "error", *args,
+            "pipe:0" if from_memory else source,
+            stdin=asyncio.subprocess.PIPE if from_memory else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError as e:
+        logger.error("[AUDIO] Falha ao executar ffprobe: %s", e)
+        return None
+
+    try:
+        # O ffprobe para de ler o stdin assim que acha o cabeçalho;
+        # communicate() ignora o BrokenPipe resultante.
+        stdout, _ = await asyncio.wait_for(
+            proc.communicate(source if from_memory else None),
+            timeout=FFPROBE_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.error("[AUDIO] ffprobe excedeu o timeout de %ss", FFPROBE_TIMEOUT)
+        return None
+
+    if proc.returncode != 0:
+        return None
+    return stdout.decode(errors="replace").strip()
+
+
+async def _has_audio_stream(source: str | bytes) -> bool:
+    """
+    Verifica se o áudio contém uma stream de áudio válida.
 
+    Args:
+        source: Caminho do arquivo ou conteúdo do áudio em memória.
+
+    Retorna:
+        True se o ffprobe encontrou ao menos uma stream de áudio.
+    """
+    codec_type = await _run_ffprobe(
+        source,
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_type",
+        "-of", "default=nw=1:nk=1",
+    )
+    return codec_type == "audio"
 
-def convert_to_mp3(input_path: str) -> str:
+
+async def convert_to_mp3(source: str | bytes, input_size: int | None = None) -> PreparedAudio:
     """
     Converte qualquer formato de áudio para MP3 mono 16kHz.
 
+    Usado apenas para formatos fora de WHISPER_NATIVE_FORMATS.
+
     Parâmetros de conversão otimizados para speech-to-text:
         - Mono (1 canal): Voz humana não precisa de estéreo
         - 16kHz: Frequência padrão para reconhecimento de fala
         - 64kbps: Suficiente para voz, mantém arquivo pequeno
+        - Pausas longas (> 1s abaixo de -50dB) encurtadas para 0.5s:
+          menos bytes enviados e menos áudio para o Whisper decodificar
+
+    O MP3 sai pelo stdout do ffmpeg (pipe:1) direto para a memória —
+    nenhum arquivo de saída é escrito em disco.
 
     Args:
-        input_path: Caminho do arquivo de áudio original.
+        source: Caminho do arquivo de áudio original, ou o conteúdo
+                do áudio em memória (enviado pelo stdin do ffmpeg,
+                sem passar pelo disco).
+        input_size: Tamanho original em bytes (só para log). O pipeline
+                    já conhece esse valor; evita um stat no disco.
+                    Se omitido, usa len(source) para áudio em memória.
 
     Retorna:
-        Caminho do arquivo MP3 convertido.
+        PreparedAudio com o MP3 convertido.
 
     Raises:
         AudioValidationError: Se a conversão falhar.
     """
-    output_path = get_temp_filepath("mp3")
+    from_memory = not isinstance(source, str)
+    if input_size is None and from_memory:
+        input_size = len(source)
 
     try:
-        logger.info(f"[AUDIO] Convertendo {input_path} → MP3")
-
-        # Carrega o áudio (pydub detecta formato automaticamente via ffmpeg)
-        audio = AudioSegment.from_file(input_path)
-
-        # Converte para parâmetros ideais de speech-to-text
-        audio = audio.set_channels(1)         # Mono
-        audio = audio.set_frame_rate(16000)    # 16kHz  (padrão STT)
-        audio = audio.set_sample_width(2)      # 16-bit (padrão STT)
-
-        # Exporta como MP3 com bitrate baixo (voz não precisa de mais)
-        audio.export(
-            output_path,
-            format="mp3",
-            bitrate="64k",
+        if from_memory:
+            logger.info("[AUDIO] Convertendo áudio em memória → MP3")
+        else:
+            logger.info("[AUDIO] Convertendo %s → MP3", source)
+
+        # Uma única chamada ao ffmpeg: decodifica, faz downmix/resample
+        # e codifica em MP3 sem materializar o PCM em memória no Python
+        proc = await asyncio.create_subprocess_exec(
+            FFMPEG_BIN, "-hide_banner", "-loglevel", "error",
+            "-threads", "1",            # Um núcleo por conversão
+            "-i", "pipe:0" if from_memory else source,
+            "-vn",                      # Descarta vídeo (mp4/webm)
+            "-af", SILENCE_FILTER,      # Encurta pausas longas
+            "-ac", "1",                 # Mono
+            "-ar", "16000",             # 16kHz  (padrão STT)
+            "-c:a", "libmp3lame",
+            "-b:a", "64k",              # Voz não precisa de mais
+            "-f", "mp3", "pipe:1",
+            stdin=asyncio.subprocess.PIPE if from_memory else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
+        stdout, stderr = await proc.communicate(source if from_memory else None)
 
-        input_size = os.path.getsize(input_path)
-        output_size = os.path.getsize(output_path)
-        logger.info(
-            f"[AUDIO] Conversão OK: {format_file_size(input_size)} → "
-            f"{format_file_size(output_size)}"
-        )
+        if proc.returncode != 0 or not stdout:
+            raise subprocess.CalledProcessError(proc.returncode, "ffmpeg", stderr=stderr)
 
-        return output_path
+        # format_file_size só roda se o log INFO for de fato emitido
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "[AUDIO] Conversão OK: %s → %s",
+                format_file_size(input_size) if input_size is not None else "?",
+                format_file_size(len(stdout)),
+            )
+
+        return PreparedAudio(data=stdout, filename="audio.mp3")
 
     except Exception as e:
-        cleanup_file(output_path)
-        logger.error(f"[AUDIO] Erro na conversão: {e}")
+        # CalledProcessError traz a mensagem real do ffmpeg no stderr
+        detail = getattr(e, "stderr", None) or b""
+        detail = detail.decode(errors="replace").strip() or str(e)
+        logger.error("[AUDIO] Erro na conversão: %s", detail)
         raise AudioValidationError(
             "❌ Erro ao processar o áudio.\n"
             "💡 O formato pode não ser suportado. "
@@ -190,95 +355,97 @@ def convert_to_mp3(input_path: str) -> str:
 async def download_and_prepare_audio(
     telegram_file,
     original_filename: str | None = None,
-) -> str:
+    duration: float = 0.0,
+) -> PreparedAudio:
     """
     Pipeline completo: download do Telegram → conversão → pronto para Whisper.
 
+    Todo o pipeline acontece em memória: o arquivo é baixado para um
+    buffer, validado/convertido via stdin/stdout do ffmpeg e entregue
+    ao Whisper sem ser escrito em disco.
+
     Etapas:
-        1. Faz download do arquivo do Telegram para diretório temp
+        1. Faz download do arquivo do Telegram para a memória
         2. Verifica se precisa de conversão
         3. Se sim, converte para MP3 mono 16kHz
-        4. Retorna caminho do arquivo pronto para transcrição
+           (o próprio ffmpeg valida o arquivo)
+        4. Se não, valida o cabeçalho com ffprobe
+        5. Retorna o áudio pronto para transcrição
 
     Args:
         telegram_file: Objeto File do python-telegram-bot.
         original_filename: Nome original do arquivo (para detectar formato).
+                           VOICE_MESSAGE_FILENAME para voice messages;
+                           None se desconhecido — nesse caso o áudio é
+                           sempre convertido (o ffmpeg detecta o formato).
+        duration: Duração informada pelo Telegram (0 se desconhecida).
+                  Vai junto no PreparedAudio — evita rodar um ffprobe
+                  só para medir a duração.
 
     Retorna:
-        Caminho do arquivo de áudio pronto para enviar ao Whisper.
+        PreparedAudio pronto para enviar ao Whisper.
 
     Raises:
         AudioValidationError: Se download ou conversão falharem.
     """
-    # Determina extensão do arquivo
-    if original_filename:
-        ext = _get_file_extension(original_filename)
-    else:
-        # Voice messages do Telegram não têm nome de arquivo
-        ext = "ogg"
+    # Determina extensão do arquivo (None = formato desconhecido)
+    ext = _get_file_extension(original_filename) if original_filename else None
 
     # Valida formato suportado
-    if ext not in SUPPORTED_FORMATS:
+    if ext is not None and ext not in SUPPORTED_FORMATS:
         raise AudioValidationError(
             f"❌ Formato '.{ext}' não suportado.\n"
             f"📋 Formatos aceitos: MP3, OGG, WAV, M4A, FLAC, AAC, OPUS, WebM"
         )
 
-    # Download para arquivo temporário
-    download_path = get_temp_filepath(ext)
+    spill_path: str | None = None
 
     try:
-        logger.info(f"[AUDIO] Baixando arquivo do Telegram (formato: .{ext})")
-        await telegram_file.download_to_drive(download_path)
-
-        file_size = os.path.getsize(download_path)
-        logger.info(f"[AUDIO] Download concluído: {format_file_size(file_size)}")
-
-        # Validação extra: tenta carregar o cabeçalho do áudio para ver se é válido
-        # Se não for um áudio real, pydub/ffmpeg vai disparar erro aqui
-        try:
-            AudioSegment.from_file(download_path).duration_seconds
-        except Exception as e:
-            logger.error(f"[SECURITY] Arquivo baixado não parece ser um áudio válido: {e}")
+        logger.info(
+            "[AUDIO] Baixando arquivo do Telegram (formato: %s)",
+            f".{ext}" if ext else "desconhecido",
+        )
+        data = bytes(await telegram_file.download_as_bytearray())
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[AUDIO] Download concluído: %s", format_file_size(len(data)))
+
+        # Formatos que exigem seek não podem ser lidos do stdin:
+        # só esses (e os desconhecidos, que podem ser um deles)
+        # passam pelo disco antes do ffmpeg/ffprobe
+        source: str | bytes = data
+        if ext is None or ext in PIPE_UNSAFE_FORMATS:
+            spill_path = write_temp_file(data, ext or "bin")
+            source = spill_path
+
+        # Converte para MP3 se necessário. O próprio ffmpeg valida o
+        # arquivo: se não for um áudio real, a conversão falha.
+        if _needs_conversion(ext):
+            async with _FFMPEG_SEMAPHORE:
+                converted = await convert_to_mp3(source, input_size=len(data))
+            converted.duration = duration
+            return converted
+
+        # Sem conversão: valida pelo cabeçalho (ffprobe, sem decodificar)
+        if not await _has_audio_stream(source):
+            logger.error("[SECURITY] Arquivo baixado não parece ser um áudio válido")
             raise AudioValidationError(
                 "❌ O arquivo enviado não é um áudio válido ou está corrompido.\n"
                 "💡 Tente enviar o áudio novamente."
             )
 
-        # Converte para MP3 se necessário
-        if _needs_conversion(download_path):
-            mp3_path = convert_to_mp3(download_path)
-            cleanup_file(download_path)  # Remove o arquivo original
-            return mp3_path
-
-        return download_path
+        return PreparedAudio(
+            data=data,
+            filename=f"audio.{UPLOAD_EXTENSIONS.get(ext, ext)}",
+            duration=duration,
+        )
 
     except AudioValidationError:
-        cleanup_file(download_path)
         raise
     except Exception as e:
-        cleanup_file(download_path)
-        logger.error(f"[AUDIO] Erro no download: {e}")
+        logger.error("[AUDIO] Erro no download: %s", e)
         raise AudioValidationError(
             "❌ Erro ao baixar o áudio do Telegram.\n"
             "💡 Tente enviar novamente."
         ) from e
-
-
-def get_audio_duration(file_path: str) -> float:
-    """
-    Retorna a duração do áudio em segundos.
-
-    Args:
-        file_path: Caminho do arquivo de áudio.
-
-    Retorna:
-        Duração em segundos (float).
-        Retorna 0.0 se não conseguir determinar.
-    """
-    try:
-        audio = AudioSegment.from_file(file_path)
-        return len(audio) / 1000.0  # pydub retorna em milissegundos
-    except Exception as e:
-        logger.warning(f"[AUDIO] Não foi possível obter duração: {e}")
-        return 0.0
+    finally:
+        cleanup_file(spill_path)
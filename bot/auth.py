@@ -10,10 +10,13 @@ Como funciona:
     2. Bot compara com BOT_PASSWORD do .env
     3. Se correto, user_id é salvo em authorized_users.json
     4. Nas próximas interações, bot verifica se user_id está na lista
+       (mantida em memória — o JSON só é lido uma vez, no startup)
     5. Não precisa autenticar novamente (persistente)
 
 Segurança:
     - Senha comparada com hmac.compare_digest (resistente a timing attacks)
+      sobre digests BLAKE2b de tamanho fixo — a senha em texto puro não
+      fica guardada no módulo
     - Arquivo JSON salvo localmente (funciona sem banco de dados)
     - Em produção (Railway), o arquivo persiste entre restarts
       dentro do mesmo deploy (não entre redeploys)
@@ -27,6 +30,7 @@ Uso:
         # pedir autenticação
 """
 
+import hashlib
 import json
 import hmac
 import logging
@@ -41,6 +45,15 @@ logger = logging.getLogger(__name__)
 # Caminho do arquivo de usuários autorizados
 _AUTH_FILE = Path(settings.DATA_DIR) / "authorized_users.json"
 
+# Digest da senha calculado uma única vez no import. A comparação é
+# feita entre digests de 32 bytes (tamanho fixo, tempo constante).
+_PASSWORD_DIGEST = hashlib.blake2b(settings.BOT_PASSWORD.encode(), digest_size=32).digest()
+
+# Cache em memória dos usuários autorizados. É preenchido na primeira
+# consulta e mantido em sincronia nas escritas — o JSON é apenas a
+# camada de persistência (write-through), não é relido a cada mensagem.
+_authorized_cache: set[int] | None = None
+
 
 def _ensure_data_dir() -> None:
     """Cria o diretório de dados se não existir."""
@@ -49,43 +62,72 @@ def _ensure_data_dir() -> None:
 
 def _load_authorized_users() -> set[int]:
     """
-    Carrega a lista de user_ids autorizados do arquivo JSON.
+    Retorna o conjunto de user_ids autorizados.
+
+    O arquivo JSON só é lido na primeira chamada; as seguintes
+    devolvem o cache em memória (lookup O(1), sem I/O).
 
     Retorna:
         set[int]: Conjunto de IDs de usuários autorizados.
                   Retorna set vazio se o arquivo não existir.
     """
-    if not _AUTH_FILE.exists():
-        return set()
+    global _authorized_cache
+
+    if _authorized_cache is not None:
+        return _authorized_cache
+
+    _authorized_cache = set()
 
     try:
-        with open(_AUTH_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return set(data.get("authorized_users", []))
-    except (json.JSONDecodeError, IOError) as e:
-        logger.error(f"Erro ao ler arquivo de autorizados: {e}")
-        return set()
+        # Arquivo pequeno (<1 KB): uma única leitura em bytes
+        data = json.loads(_AUTH_FILE.read_bytes())
+        _authorized_cache = set(data.get("authorized_users", []))
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, OSError) as e:
+        logger.error("Erro ao ler arquivo de autorizados: %s", e)
+
+    return _authorized_cache
 
 
 def _save_authorized_users(users: set[int]) -> None:
     """
-    Salva a lista de user_ids autorizados no arquivo JSON.
+    Atualiza o cache e salva a lista de user_ids autorizados no arquivo JSON.
 
     Args:
         users: Conjunto de IDs de usuários autorizados.
     """
+    global _authorized_cache
+
+    _authorized_cache = users
     _ensure_data_dir()
 
+    # Escreve num arquivo temporário e troca de uma vez (os.replace é
+    # atômico): um crash no meio da escrita não corrompe a lista
+    tmp_file = _AUTH_FILE.with_suffix(".json.tmp")
+
     try:
-        with open(_AUTH_FILE, "w", encoding="utf-8") as f:
-            json.dump(
-                {"authorized_users": sorted(users)},
-                f,
-                indent=2,
-            )
-        logger.info(f"Lista de autorizados atualizada: {len(users)} usuário(s)")
-    except IOError as e:
-        logger.error(f"Erro ao salvar arquivo de autorizados: {e}")
+        # Arquivo lido só pela máquina: JSON compacto, sem indentação
+        # nem ordenação (evita o pretty-printer e a cópia da lista)
+        payload = json.dumps({"authorized_users": list(users)}, separators=(",", ":"))
+        tmp_file.write_bytes(payload.encode())
+        os.replace(tmp_file, _AUTH_FILE)
+        logger.info("Lista de autorizados atualizada: %d usuário(s)", len(users))
+    except OSError as e:
+        logger.error("Erro ao salvar arquivo de autorizados: %s", e)
+
+
+def preload_authorized_users() -> int:
+    """
+    Carrega a lista de autorizados para a memória.
+
+    Chamado no startup: assim a leitura do JSON não cai na primeira
+    mensagem recebida, e todo is_authorized é só um lookup no set.
+
+    Retorna:
+        Quantidade de usuários autorizados.
+    """
+    return len(_load_authorized_users())
 
 
 def is_authorized(user_id: int) -> bool:
@@ -98,8 +140,7 @@ def is_authorized(user_id: int) -> bool:
     Retorna:
         True se o usuário já se autenticou com a senha correta.
     """
-    authorized = _load_authorized_users()
-    return user_id in authorized
+    return user_id in _load_authorized_users()
 
 
 def authenticate_user(user_id: int, password: str) -> bool:
@@ -108,7 +149,9 @@ def authenticate_user(user_id: int, password: str) -> bool:
 
     Usa hmac.compare_digest para comparação segura da senha
     (resistente a timing attacks — um atacante não consegue
-    descobrir a senha medindo o tempo de resposta).
+    descobrir a senha medindo o tempo de resposta). Compara o
+    digest BLAKE2b da tentativa com o da senha configurada, então
+    senhas com caracteres não-ASCII também funcionam.
 
     Args:
         user_id: ID do usuário no Telegram.
@@ -117,17 +160,20 @@ def authenticate_user(user_id: int, password: str) -> bool:
     Retorna:
         True se a senha está correta e o usuário foi autorizado.
     """
-    # Comparação segura contra timing attacks
-    is_valid = hmac.compare_digest(password.strip(), settings.BOT_PASSWORD)
+    # Comparação segura contra timing attacks (digests de tamanho fixo)
+    attempt = hashlib.blake2b(password.strip().encode(), digest_size=32).digest()
+    is_valid = hmac.compare_digest(attempt, _PASSWORD_DIGEST)
 
     if is_valid:
         users = _load_authorized_users()
-        users.add(user_id)
-        _save_authorized_users(users)
-        logger.info(f"[AUTH] Usuário {mask_user_id(user_id)} autenticado com sucesso")
+        # Reautenticação de quem já está na lista não reescreve o arquivo
+        if user_id not in users:
+            users.add(user_id)
+            _save_authorized_users(users)
+        logger.info("[AUTH] Usuário %s autenticado com sucesso", mask_user_id(user_id))
         return True
 
-    logger.warning(f"[AUTH] Tentativa de autenticação falhou para usuário {mask_user_id(user_id)}")
+    logger.warning("[AUTH] Tentativa de autenticação falhou para usuário %s", mask_user_id(user_id))
     return False
 
 
@@ -149,7 +195,7 @@ def revoke_user(user_id: int) -> bool:
     if user_id in users:
         users.discard(user_id)
         _save_authorized_users(users)
-        logger.info(f"[AUTH] Usuário {mask_user_id(user_id)} teve acesso revogado")
+        logger.info("[AUTH] Usuário %s teve acesso revogado", mask_user_id(user_id))
         return True
 
     return False
@@ -23,8 +23,12 @@ Uso:
     setup_handlers(application)
 """
 
+import asyncio
+import hashlib
 import logging
+import random
 import time
+from dataclasses import dataclass, field
 
 from telegram import Update
 from telegram.constants import ChatAction
@@ -37,101 +41,251 @@ from telegram.ext import (
     filters,
 )
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.error import Conflict
+from telegram.error import Conflict, RetryAfter
 
 from bot.audio_processor import (
+    SUPPORTED_FORMATS,
+    VOICE_MESSAGE_FILENAME,
     AudioValidationError,
     download_and_prepare_audio,
-    get_audio_duration,
     validate_audio_size,
 )
+from bot import metrics
 from bot.auth import authenticate_user, is_authorized
 from bot.transcription import TranscriptionError, transcribe_audio, post_process_transcription
 from bot.utils import (
-    cleanup_file,
+    TTLCache,
     format_duration,
     format_file_size,
-    get_language_name,
     mask_user_id,
 )
+from config.settings import settings
 
 # Rate limiting e anti-brute force (em memória)
-# {user_id: [timestamps_das_requests]}
-_user_requests: dict[int, list[float]] = {}
-# {user_id: {"attempts": int, "lockout_until": float}}
-_auth_attempts: dict[int, dict] = {}
+# Todos limitados em tamanho e com expiração automática (TTLCache),
+# para não crescerem indefinidamente em um bot de longa duração.
+# Token bucket: {user_id: (tokens, último_refill)} — dois floats por usuário.
+# Um balde parado por 60s já estaria cheio, então a entrada pode expirar.
+_user_buckets = TTLCache(maxsize=10_000, ttl=60)
+# {user_id: {"prev_count", "curr_count", "window_start", "lockout_until"}}
+# — janela deslizante de falhas; a TTL cobre as duas janelas e o lockout
+_auth_attempts = TTLCache(maxsize=10_000, ttl=3600)
 
 # Cache temporário de áudio para seleção de formato
-# {user_id: {"file_id": str, "timestamp": float, "original_filename": str}}
-_audio_cache: dict[int, dict] = {}
+# {user_id: {"file_id", "file_unique_id", "original_filename", "duration_hint"}}
+# — expira em 1 hora
+_audio_cache = TTLCache(maxsize=1_000, ttl=3600)
+
+# Transcrições já feitas: {file_unique_id: TranscriptionResult} e
+# {"sha256:<hex>": TranscriptionResult} (mesmo objeto nas duas chaves).
+# O texto do Whisper não depende do formato escolhido, então pedir
+# outro formato do mesmo áudio — ou reenviar o mesmo áudio — pula
+# download, ffmpeg e Whisper (só o pós-processamento GPT roda de novo)
+_transcription_cache = TTLCache(maxsize=512, ttl=3600)
+
+# Resultados do pós-processamento GPT: {(file_unique_id, format_type): texto}
+# A transcrição de um áudio é imutável, então o resultado também é
+_post_cache = TTLCache(maxsize=512, ttl=3600)
+
+# Fila de transcrições (itens: _TranscriptionJob) e workers que a
+# consomem (criados sob demanda). A fila é limitada: numa rajada maior
+# que isso o usuário recebe "ocupado" em vez de esperar indefinidamente.
+# Um worker por transcrição simultânea permitida: com menos workers,
+# WHISPER_MAX_CONCURRENCY nunca seria atingido
+TRANSCRIPTION_WORKERS = settings.WHISPER_MAX_CONCURRENCY
+TRANSCRIPTION_QUEUE_SIZE = 32
+_job_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+
+# Transcrições em andamento: {file_unique_id: Task}. Um segundo pedido do
+# mesmo áudio (duplo clique, ou outro usuário com o mesmo arquivo)
+# aguarda a task existente em vez de rodar o Whisper de novo
+_inflight: dict[str, asyncio.Task] = {}
+
+# Chats aguardando cada transcrição em andamento: {file_unique_id: {chat_id}}.
+# Todos recebem o indicador "digitando..." durante os retries do Whisper
+_inflight_chats: dict[str, set[int]] = {}
+
+# Pós-processamentos GPT em andamento: {(file_unique_id, format_type): Task}.
+# Mesmo esquema: cliques simultâneos no mesmo formato do mesmo áudio
+# fazem uma única chamada ao GPT
+_post_inflight: dict[tuple[str, str], asyncio.Task] = {}
+
+# Edições de status em segundo plano (ver _set_status). O event loop só
+# guarda referência fraca às tasks; este set impede que sejam coletadas
+# antes de terminar
+_background_tasks: set[asyncio.Task] = set()
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _TranscriptionJob:
+    """
+    Um pedido de transcrição na fila dos workers.
+
+    Atributos:
+        bot: Bot do Telegram (para baixar o arquivo).
+        query: CallbackQuery cuja mensagem recebe o resultado.
+        file_id: file_id do áudio (usado para o download).
+        file_unique_id: ID estável do arquivo (chave dos caches).
+        original_filename: Nome original do arquivo (VOICE_MESSAGE_FILENAME
+            para voz; None se o Telegram não informou).
+        duration_hint: Duração informada pelo Telegram (0 se desconhecida).
+        format_type: 'raw', 'summary', 'minutes' ou 'corrected'.
+        start_time: Momento da escolha do formato (para medir o tempo total).
+        status_task: Última edição de status disparada (ver _set_status).
+    """
+
+    bot: object
+    query: object
+    file_id: str
+    file_unique_id: str
+    original_filename: str | None
+    duration_hint: float
+    format_type: str
+    start_time: float
+    status_task: asyncio.Task | None = field(default=None, repr=False)
+
+
+# Rate limit: até 5 áudios de rajada, reabastecendo 5 por minuto
+RATE_LIMIT_CAPACITY = 5.0
+RATE_LIMIT_REFILL_PER_SEC = RATE_LIMIT_CAPACITY / 60.0
+
+# Tamanho máximo de cada mensagem enviada (limite do Telegram é 4096)
+# e intervalo entre as partes de uma resposta longa (~25 msg/s)
+MAX_MESSAGE_LENGTH = 4000
+LONG_MESSAGE_INTERVAL = 1 / 25
+
+# Anti brute-force: 5 falhas numa janela deslizante de 10 min → 10 min de bloqueio
+AUTH_MAX_FAILURES = 5
+AUTH_WINDOW_SECONDS = 600
+AUTH_LOCKOUT_SECONDS = 600
+
+
 # ============================================================
 # Mensagens do Bot (centralizadas para fácil manutenção)
 # ============================================================
-# Usar Markdown V2 do Telegram para formatação.
-# Caracteres especiais precisam de escape com \.
+# Usar HTML do Telegram para formatação (<b>, <i>, <code>).
+# Só &, < e > precisam de escape — texto dinâmico vindo do
+# usuário passa por html.escape antes de ser interpolado.
 # ============================================================
 
+# Bloco de informações comum às mensagens de boas-vindas e de
+# autenticação — montado uma vez no import, mantido em um só lugar
+_COMMON_INFO = (
+    "📌 <b>Idiomas</b>: Português (BR), Inglês, Espanhol + auto-detect\n"
+    f"📏 <b>Limite</b>: {settings.MAX_AUDIO_SIZE_MB}MB por áudio\n"
+    "🎯 <b>Precisão</b>: Máxima (temperatura 0)\n\n"
+)
+
 WELCOME_MESSAGE = (
-    "🎙️ *Bot de Transcrição de Áudio*\n\n"
-    "Envie um áudio ou mensagem de voz e eu transcrevo para texto\\!\n\n"
-    "📌 *Idiomas*: Português \\(BR\\), Inglês, Espanhol \\+ auto\\-detect\n"
-    "📏 *Limite*: 25MB por áudio\n"
-    "🎯 *Precisão*: Máxima \\(temperatura 0\\)\n\n"
-    "Basta enviar o áudio\\! 🎧"
+    "🎙️ <b>Bot de Transcrição de Áudio</b>\n\n"
+    "Envie um áudio ou mensagem de voz e eu transcrevo para texto!\n\n"
+    + _COMMON_INFO +
+    "Basta enviar o áudio! 🎧"
 )
 
 AUTH_REQUIRED_MESSAGE = (
-    "🔒 *Acesso protegido*\n\n"
-    "Use `/start SUA_SENHA` para autenticar\\.\n\n"
-    "_Este bot é de uso pessoal e requer senha\\._"
+    "🔒 <b>Acesso protegido</b>\n\n"
+    "Use <code>/start SUA_SENHA</code> para autenticar.\n\n"
+    "<i>Este bot é de uso pessoal e requer senha.</i>"
 )
 
 AUTH_SUCCESS_MESSAGE = (
-    "✅ *Autenticado com sucesso\\!*\n\n"
-    "🎙️ Agora é só enviar um áudio ou mensagem de voz\\!\n\n"
-    "📌 *Idiomas suportados*: Português \\(BR\\), Inglês, Espanhol\n"
-    "📏 *Limite*: 25MB por áudio\n"
-    "🎯 *Precisão*: Máxima \\(sem alucinações\\)\n\n"
-    "Use /help para mais informações\\."
+    "✅ <b>Autenticado com sucesso!</b>\n\n"
+    "🎙️ Agora é só enviar um áudio ou mensagem de voz!\n\n"
+    + _COMMON_INFO +
+    "Use /help para mais informações."
 )
 
 AUTH_FAILED_MESSAGE = (
-    "❌ *Senha incorreta*\n\n"
-    "Tente novamente com `/start SUA_SENHA`\\.\n\n"
-    "_Dica: a senha é definida na variável BOT\\_PASSWORD\\._"
+    "❌ <b>Senha incorreta</b>\n\n"
+    "Tente novamente com <code>/start SUA_SENHA</code>.\n\n"
+    "<i>Dica: a senha é definida na variável BOT_PASSWORD.</i>"
+)
+
+AUTH_LOCKED_MESSAGE = (
+    "🚫 <b>Acesso Bloqueado</b>\n\n"
+    "Muitas tentativas incorretas.\n"
+    "Tente novamente em {time_left}."
+)
+
+BUSY_MESSAGE = (
+    "⏳ <b>Bot ocupado</b>: muitos áudios na fila agora.\n\n"
+    "Tente de novo em instantes — é só escolher o formato outra vez."
+)
+
+RATE_LIMIT_MESSAGE = (
+    "⏳ <b>Calma lá!</b>\n\n"
+    "Você atingiu o limite de 5 áudios por minuto.\n"
+    "Aguarde um instante antes de mandar o próximo."
 )
 
 HELP_MESSAGE = (
-    "📖 *Como usar o bot*\n\n"
-    "*Comandos:*\n"
-    "  /start \\[senha\\] — Autenticar\n"
+    "📖 <b>Como usar o bot</b>\n\n"
+    "<b>Comandos:</b>\n"
+    "  /start [senha] — Autenticar\n"
     "  /help — Esta mensagem\n\n"
-    "*Transcrição:*\n"
-    "  1\\. Envie um áudio ou mensagem de voz\n"
-    "  2\\. Aguarde o processamento\n"
-    "  3\\. Receba a transcrição\\!\n\n"
-    "*Idiomas suportados:*\n"
-    "  🇧🇷 Português \\(BR\\)\n"
+    "<b>Transcrição:</b>\n"
+    "  1. Envie um áudio ou mensagem de voz\n"
+    "  2. Aguarde o processamento\n"
+    "  3. Receba a transcrição!\n\n"
+    "<b>Idiomas suportados:</b>\n"
+    "  🇧🇷 Português (BR)\n"
     "  🇺🇸 Inglês\n"
     "  🇪🇸 Espanhol\n"
-    "  \\+ 50\\+ idiomas com auto\\-detect\n\n"
-    "*Formatos aceitos:*\n"
+    "  + 50+ idiomas com auto-detect\n\n"
+    "<b>Formatos aceitos:</b>\n"
     "  MP3, OGG, WAV, M4A, FLAC, AAC, OPUS, WebM\n\n"
-    "*Limites:*\n"
-    "  📏 Tamanho: 25MB\n"
+    "<b>Limites:</b>\n"
+    f"  📏 Tamanho: {settings.MAX_AUDIO_SIZE_MB}MB\n"
     "  ⏱️ Timeout: 5 minutos\n\n"
-    "*Precisão:*\n"
-    "  🎯 Temperatura 0 \\(zero alucinações\\)\n"
+    "<b>Precisão:</b>\n"
+    "  🎯 Temperatura 0 (zero alucinações)\n"
     "  🤖 Sem prompts indutivos\n"
     "  🌍 Detecção automática de idioma"
 )
 
 PROCESSING_MESSAGE = "🎙️ Processando áudio..."
 
+# Títulos da resposta final, por formato
+_TITLES = {
+    "raw": "Transcrição Crua",
+    "summary": "Resumo Executivo",
+    "minutes": "Ata Profissional",
+    "corrected": "Texto Corrigido",
+}
+
+_SEPARATOR = "─────────────────"
+
+# Cabeçalho (título + separador) de cada formato e início do rodapé,
+# montados uma vez no import
+_HEADERS = {fmt: f"📝 {title}\n{_SEPARATOR}\n\n" for fmt, title in _TITLES.items()}
+_DEFAULT_HEADER = f"📝 Resultado\n{_SEPARATOR}\n\n"
+_FOOTER_START = f"\n\n{_SEPARATOR}\n"
+
+# Menu de escolha de formato (HTML) e seu teclado — iguais para
+# todo áudio, então são montados uma única vez no import
+FORMAT_MENU_MESSAGE = (
+    "🎙️ <b>Áudio recebido!</b> Como deseja o texto?\n\n"
+    "📄 <b>Resumo</b>: Pontos principais (BLUF)\n"
+    "📋 <b>Ata</b>: Formato corporativo\n"
+    "✍️ <b>Correção</b>: Texto corrigido e formatado\n"
+    "📝 <b>Crua</b>: Transcrição exata do áudio"
+)
+
+FORMAT_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("📄 Resumo", callback_data="fmt_summary"),
+        InlineKeyboardButton("📋 Ata", callback_data="fmt_minutes"),
+    ],
+    [
+        InlineKeyboardButton("✍️ Correção", callback_data="fmt_corrected"),
+        InlineKeyboardButton("📝 Crua", callback_data="fmt_raw"),
+    ],
+])
+
 
 # ============================================================
 # Handlers
@@ -153,16 +307,15 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     user = update.effective_user
     user_id = user.id
 
-    logger.info(f"[CMD] /start de {user.first_name} (ID: {mask_user_id(user_id)})")
+    logger.info("[CMD] /start de %s (ID: %s)", user.first_name, mask_user_id(user_id))
 
     # ---------- 1. Verifica Lockout ----------
     is_locked, time_left = _check_auth_lockout(user_id)
     if is_locked:
+        metrics.inc("bot_requests_total", kind="auth", outcome="locked")
         await update.message.reply_text(
-            f"🚫 *Acesso Bloqueado*\n\n"
-            f"Muitas tentativas incorretas\\.\n"
-            f"Tente novamente em {format_duration(time_left)}\\.",
-            parse_mode="MarkdownV2"
+            AUTH_LOCKED_MESSAGE.format(time_left=format_duration(time_left)),
+            parse_mode="HTML",
         )
         return
 
@@ -170,7 +323,7 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if is_authorized(user_id):
         await update.message.reply_text(
             WELCOME_MESSAGE,
-            parse_mode="MarkdownV2",
+            parse_mode="HTML",
         )
         return
 
@@ -179,7 +332,7 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not args:
         await update.message.reply_text(
             AUTH_REQUIRED_MESSAGE,
-            parse_mode="MarkdownV2",
+            parse_mode="HTML",
         )
         return
 
@@ -188,20 +341,21 @@ async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     if authenticate_user(user_id, password):
         # Sucesso: Limpa tentativas
-        if user_id in _auth_attempts:
-            _auth_attempts.pop(user_id)
-            
+        _auth_attempts.pop(user_id, None)
+        metrics.inc("bot_requests_total", kind="auth", outcome="success")
+
         await update.message.reply_text(
             AUTH_SUCCESS_MESSAGE,
-            parse_mode="MarkdownV2",
+            parse_mode="HTML",
         )
     else:
         # Falha: Registra tentativa
         _register_auth_failure(user_id)
+        metrics.inc("bot_requests_total", kind="auth", outcome="failure")
         
         await update.message.reply_text(
             AUTH_FAILED_MESSAGE,
-            parse_mode="MarkdownV2",
+            parse_mode="HTML",
         )
 
 
@@ -212,11 +366,11 @@ async def help_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     Mostra instruções de uso, idiomas suportados e limites.
     Disponível para todos (não requer autenticação).
     """
-    logger.info(f"[CMD] /help de {update.effective_user.first_name}")
+    logger.info("[CMD] /help de %s", update.effective_user.first_name)
 
     await update.message.reply_text(
         HELP_MESSAGE,
-        parse_mode="MarkdownV2",
+        parse_mode="HTML",
     )
 
 
@@ -224,25 +378,29 @@ def _check_rate_limit(user_id: int) -> bool:
     """
     Verifica se o usuário atingiu o limite de requests (5 por minuto).
 
+    Usa token bucket: cada usuário tem até RATE_LIMIT_CAPACITY fichas,
+    reabastecidas continuamente; cada áudio consome uma. O(1) e
+    memória constante por usuário.
+
     Args:
         user_id: ID do usuário no Telegram.
 
     Retorna:
         True se estiver dentro do limite, False se excedeu.
     """
-    now = time.time()
-    if user_id not in _user_requests:
-        _user_requests[user_id] = []
+    now = time.monotonic()
+    tokens, last = _user_buckets.get(user_id, (RATE_LIMIT_CAPACITY, now))
 
-    # Remove timestamps antigos (> 60s)
-    _user_requests[user_id] = [t for t in _user_requests[user_id] if now - t < 60]
+    # Reabastece proporcionalmente ao tempo desde a última request
+    tokens = min(RATE_LIMIT_CAPACITY, tokens + (now - last) * RATE_LIMIT_REFILL_PER_SEC)
 
     # Verifica o limite
-    if len(_user_requests[user_id]) >= 5:
+    if tokens < 1:
+        _user_buckets[user_id] = (tokens, now)
         return False
 
-    # Registra a nova request
-    _user_requests[user_id].append(now)
+    # Consome uma ficha pela nova request
+    _user_buckets[user_id] = (tokens - 1, now)
     return True
 
 
@@ -253,11 +411,11 @@ def _check_auth_lockout(user_id: int) -> tuple[bool, float]:
     Retorna:
         (is_locked, time_left_seconds)
     """
-    if user_id not in _auth_attempts:
+    state = _auth_attempts.get(user_id)
+    if state is None:
         return False, 0.0
 
-    state = _auth_attempts[user_id]
-    now = time.time()
+    now = time.monotonic()
 
     # Verifica se o tempo de bloqueio já passou
     if state.get("lockout_until", 0) > now:
@@ -265,24 +423,48 @@ def _check_auth_lockout(user_id: int) -> tuple[bool, float]:
 
     # Se passou do tempo e tinha bloqueio, reseta tentativas
     if state.get("lockout_until", 0) > 0:
-        _auth_attempts.pop(user_id)
+        _auth_attempts.pop(user_id, None)
         return False, 0.0
 
     return False, 0.0
 
 
 def _register_auth_failure(user_id: int) -> None:
-    """Registra uma falha de autenticação e aplica lockout se necessário."""
-    now = time.time()
-    if user_id not in _auth_attempts:
-        _auth_attempts[user_id] = {"attempts": 0, "lockout_until": 0}
-
-    _auth_attempts[user_id]["attempts"] += 1
+    """
+    Registra uma falha de autenticação e aplica lockout se necessário.
 
-    # Após 5 tentativas, bloqueia por 10 minutos
-    if _auth_attempts[user_id]["attempts"] >= 5:
-        _auth_attempts[user_id]["lockout_until"] = now + 600  # 10 min
-        logger.warning(f"[AUTH] Usuário {user_id} BLOQUEADO por 10 min (brute-force)")
+    Usa contador de janela deslizante: guarda só as falhas da janela
+    atual e da anterior, e pondera a anterior pela fração da janela
+    que ainda se sobrepõe. Falhas antigas decaem sozinhas — quatro
+    erros espalhados ao longo de uma semana não causam bloqueio.
+    """
+    now = time.monotonic()
+    state = _auth_attempts.get(user_id)
+    if state is None:
+        state = {"prev_count": 0, "curr_count": 0, "window_start": now, "lockout_until": 0}
+
+    # Rotaciona a janela se a atual já terminou. Avança em passos
+    # alinhados (múltiplos da janela), e não para "agora": assim o peso
+    # da janela anterior decai com o tempo já decorrido da atual
+    elapsed = now - state["window_start"]
+    if elapsed >= AUTH_WINDOW_SECONDS:
+        steps = int(elapsed // AUTH_WINDOW_SECONDS)
+        # Pulou mais de uma janela: a anterior também está vazia
+        state["prev_count"] = state["curr_count"] if steps == 1 else 0
+        state["curr_count"] = 0
+        state["window_start"] += steps * AUTH_WINDOW_SECONDS
+        elapsed -= steps * AUTH_WINDOW_SECONDS
+
+    state["curr_count"] += 1
+    weighted = state["prev_count"] * (1 - elapsed / AUTH_WINDOW_SECONDS) + state["curr_count"]
+
+    # Após 5 falhas na janela, bloqueia por 10 minutos
+    if weighted >= AUTH_MAX_FAILURES:
+        state["lockout_until"] = now + AUTH_LOCKOUT_SECONDS
+        logger.warning("[AUTH] Usuário %s BLOQUEADO por 10 min (brute-force)", user_id)
+
+    # Reatribui para renovar o prazo de expiração da entrada
+    _auth_attempts[user_id] = state
 
 
 async def audio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -305,18 +487,17 @@ async def audio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     if not is_authorized(user_id):
         await update.message.reply_text(
             AUTH_REQUIRED_MESSAGE,
-            parse_mode="MarkdownV2",
+            parse_mode="HTML",
         )
         return
 
     # ---------- 1.1 Rate Limiting ----------
     if not _check_rate_limit(user_id):
-        logger.warning(f"[RATE-LIMIT] Usuário {user_id} excedeu o limite")
+        logger.warning("[RATE-LIMIT] Usuário %s excedeu o limite", user_id)
+        metrics.inc("bot_requests_total", kind="audio", outcome="rate_limited")
         await update.message.reply_text(
-            "⏳ *Calma lá\\!*\n\n"
-            "Você atingiu o limite de 5 áudios por minuto\\.\n"
-            "Aguarde um instante antes de mandar o próximo\\.",
-            parse_mode="MarkdownV2"
+            RATE_LIMIT_MESSAGE,
+            parse_mode="HTML",
         )
         return
 
@@ -330,65 +511,61 @@ async def audio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     if voice:
         file_id = voice.file_id
+        file_unique_id = voice.file_unique_id
         file_size = voice.file_size or 0
-        original_filename = None  # Voice messages não têm nome
+        original_filename = VOICE_MESSAGE_FILENAME  # Voice messages não têm nome (sempre OGG)
         duration_hint = voice.duration or 0
     elif audio:
         file_id = audio.file_id
+        file_unique_id = audio.file_unique_id
         file_size = audio.file_size or 0
         original_filename = audio.file_name
         duration_hint = audio.duration or 0
     elif document:
         file_id = document.file_id
+        file_unique_id = document.file_unique_id
         file_size = document.file_size or 0
         original_filename = document.file_name
         duration_hint = 0
     else:
         return  # Não deveria chegar aqui, mas segurança extra
 
-    logger.info(
-        f"[AUDIO] Recebido de {user.first_name} (ID: {mask_user_id(user_id)}): "
-        f"tamanho={format_file_size(file_size)}, "
-        f"arquivo={original_filename or 'voice_message'}"
-    )
+    # Formatação (mask/format_file_size) só roda se o log for emitido
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "[AUDIO] Recebido de %s (ID: %s): tamanho=%s, arquivo=%s",
+            user.first_name,
+            mask_user_id(user_id),
+            format_file_size(file_size),
+            original_filename or "sem nome",
+        )
 
     # ---------- 3. Valida tamanho ----------
     try:
         validate_audio_size(file_size)
     except AudioValidationError as e:
+        metrics.inc("bot_requests_total", kind="audio", outcome="too_large")
         await update.message.reply_text(e.user_message)
         return
 
+    metrics.inc("bot_requests_total", kind="audio", outcome="admitted")
+
     # ---------- 4. Armazena em cache e pede formato ----------
     _audio_cache[user_id] = {
         "file_id": file_id,
-        "timestamp": time.time(),
+        "file_unique_id": file_unique_id,
         "original_filename": original_filename,
+        "duration_hint": duration_hint,
     }
 
-    keyboard = [
-        [
-            InlineKeyboardButton("📄 Resumo", callback_data="fmt_summary"),
-            InlineKeyboardButton("📋 Ata", callback_data="fmt_minutes"),
-        ],
-        [
-            InlineKeyboardButton("✍️ Correção", callback_data="fmt_corrected"),
-            InlineKeyboardButton("📝 Crua", callback_data="fmt_raw"),
-        ],
-    ]
-
     try:
-        await update.message.reply_text(
-            "🎙️ <b>Áudio recebido!</b> Como deseja o texto?\n\n"
-            "📄 <b>Resumo</b>: Pontos principais (BLUF)\n"
-            "📋 <b>Ata</b>: Formato corporativo\n"
-            "✍️ <b>Correção</b>: Texto corrigido e formatado\n"
-            "📝 <b>Crua</b>: Transcrição exata do áudio",
-            reply_markup=InlineKeyboardMarkup(keyboard),
+        await _tg_call(lambda: update.message.reply_text(
+            FORMAT_MENU_MESSAGE,
+            reply_markup=FORMAT_KEYBOARD,
             parse_mode="HTML",
-        )
+        ))
     except Exception as e:
-        logger.error(f"[ERROR] Falha ao enviar menu de opções: {e}")
+        logger.error("[ERROR] Falha ao enviar menu de opções: %s", e)
         await update.message.reply_text("❌ Erro ao exibir opções. Tente novamente.")
 
 
@@ -396,6 +573,9 @@ async def audio_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Processa a escolha do formato de transcrição.
+
+    Valida o cache e enfileira o job; o processamento em si acontece
+    em _process_job, dentro de um dos workers da fila.
     """
     query = update.callback_query
     await query.answer()
@@ -406,170 +586,433 @@ async def callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     # Extrai o formato (ex: "fmt_summary" -> "summary")
     format_type = query.data.replace("fmt_", "")
 
-    # Valida Cache
-    start_time = time.time()
-    cached_data = _audio_cache.get(user_id)
+    # Valida Cache (entradas com mais de 1 hora já expiraram no TTLCache)
+    # Lê e remove numa única operação, sem await no meio: num duplo
+    # clique, só o primeiro callback consegue o áudio
+    start_time = time.monotonic()
+    cached_data = _audio_cache.pop(user_id, None)
 
     if not cached_data:
         await query.edit_message_text("❌ Erro: Áudio expirado ou não encontrado. Envie novamente.")
         return
 
-    # Verifica TTL (1 hora)
-    if start_time - cached_data["timestamp"] > 3600:
-        _audio_cache.pop(user_id)
-        await query.edit_message_text("❌ Erro: Áudio expirado. Envie novamente.")
+    job = _TranscriptionJob(
+        bot=context.bot,
+        query=query,
+        file_id=cached_data["file_id"],
+        file_unique_id=cached_data["file_unique_id"],
+        original_filename=cached_data["original_filename"],
+        duration_hint=cached_data["duration_hint"],
+        format_type=format_type,
+        start_time=start_time,
+    )
+
+    # O trabalho pesado (download, Whisper, GPT) vai para a fila de
+    # workers: o handler retorna logo e o polling segue atendendo os
+    # outros chats enquanto este áudio é processado
+    _ensure_workers()
+    try:
+        _job_queue.put_nowait(job)
+    except asyncio.QueueFull:
+        # Devolve o áudio ao cache para que o mesmo menu funcione de novo
+        _audio_cache[user_id] = cached_data
+        metrics.inc("bot_requests_total", kind="audio", outcome="busy")
+        logger.warning("[WORKER] Fila cheia (%d jobs), pedido recusado", TRANSCRIPTION_QUEUE_SIZE)
+        await _tg_call(lambda: query.edit_message_text(
+            BUSY_MESSAGE, reply_markup=FORMAT_KEYBOARD, parse_mode="HTML",
+        ))
         return
 
-    file_id = cached_data["file_id"]
-    original_filename = cached_data["original_filename"]
+    # Feedback visual (sem esperar o round-trip ao Telegram)
+    _set_status(job, f"🎙️ Processando: {format_type.title()}...")
 
-    # Limpa cache para economizar memória (já pegamos o que precisava enviando para processamento)
-    _audio_cache.pop(user_id)
 
-    # Feedback visual
-    await query.edit_message_text(f"🎙️ Processando: {format_type.title()}...")
-    
-    # Processamento (reaproveitando lógica do audio_handler antigo)
-    audio_path = None
-    
+async def _process_job(job: _TranscriptionJob) -> None:
+    """
+    Executa o pipeline de transcrição de um áudio e entrega o resultado.
+
+    Roda dentro de um worker da fila (ver _worker).
+
+    Os caches são indexados pelo file_unique_id, que o Telegram mantém
+    igual para o mesmo arquivo mesmo quando reenviado ou encaminhado
+    (o file_id muda a cada mensagem).
+
+    Args:
+        job: Áudio, formato e mensagem de destino.
+    """
+    query = job.query
+    format_type = job.format_type
+    cache_key = job.file_unique_id
+
     try:
-        # Download e conversão
-        telegram_file = await context.bot.get_file(file_id)
-        audio_path = await download_and_prepare_audio(
-            telegram_file,
-            original_filename=original_filename,
-        )
+        result = _transcription_cache.get(cache_key)
+        if result is None:
+            task = _inflight.get(cache_key)
+            if task is None:
+                _inflight_chats[cache_key] = {query.message.chat_id}
+                task = asyncio.create_task(_transcribe_file(job))
+                _inflight[cache_key] = task
+                task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+                task.add_done_callback(lambda _: _inflight_chats.pop(cache_key, None))
+            else:
+                _inflight_chats[cache_key].add(query.message.chat_id)
+                metrics.inc("bot_cache_hits_total", cache="inflight")
+                logger.info("[CACHE] Aguardando transcrição em andamento de %s", cache_key)
+            # shield: se este job for cancelado, os outros que aguardam
+            # a mesma task não perdem o resultado
+            result = await asyncio.shield(task)
+        else:
+            metrics.inc("bot_cache_hits_total", cache="transcription")
+            logger.info("[CACHE] Reutilizando transcrição de %s", cache_key)
 
-        # Transcrição Whisper
-        result = await transcribe_audio(audio_path)
-        
         # Pós-processamento GPT
         final_text = result.text
         if format_type != "raw":
-            await query.edit_message_text(f"🤖 Gerando {format_type} com IA...")
-            final_text = await post_process_transcription(result.text, format_type)
-
-        elapsed = time.time() - start_time
+            post_key = (cache_key, format_type)
+            final_text = _post_cache.get(post_key)
+            if final_text is None:
+                _set_status(job, f"🤖 Gerando {format_type} com IA...")
+
+                task = _post_inflight.get(post_key)
+                if task is None:
+                    async def show_progress(partial: str) -> None:
+                        # Prévia do texto sendo gerado; a resposta final substitui.
+                        # Se a edição anterior ainda não terminou, esta é
+                        # descartada: a próxima prévia já traz o texto mais novo
+                        if job.status_task is not None and not job.status_task.done():
+                            return
+                        _set_status(job, f"{partial[-MAX_MESSAGE_LENGTH:]} ▌")
+
+                    task = asyncio.create_task(
+                        _post_process(post_key, result.text, show_progress)
+                    )
+                    _post_inflight[post_key] = task
+                    task.add_done_callback(lambda _: _post_inflight.pop(post_key, None))
+                else:
+                    metrics.inc("bot_cache_hits_total", cache="post_inflight")
+                    logger.info("[CACHE] Aguardando %s em andamento de %s", format_type, cache_key)
+
+                try:
+                    # shield: mesmo motivo da transcrição acima
+                    final_text = await asyncio.shield(task)
+                except TranscriptionError as e:
+                    # Falha do GPT não vai para o cache: a próxima escolha tenta de novo
+                    final_text = f"{e.user_message}\n\n{result.text}"
+            else:
+                metrics.inc("bot_cache_hits_total", cache="post_process")
+
+        elapsed = time.monotonic() - job.start_time
+        metrics.observe("bot_latency_seconds", elapsed, stage="total")
 
         logger.info(
-            f"[RESULTADO] Finalizado: {format_type} | "
-            f"Duração áudio: {format_duration(result.duration)}"
+            "[RESULTADO] Finalizado: %s | Duração áudio: %s",
+            format_type,
+            format_duration(result.duration),
         )
 
         response = _format_transcription_response(result, final_text, format_type, elapsed)
-        
+
+        # Nenhuma edição de status pode chegar depois da resposta final
+        await _settle_status(job)
+
         # Envia resultado (apaga msg de status anterior se possível ou edita)
         # Editando a mensagem do botão para o resultado final
         # Se for muito longo, manda chunks
-        if len(response) > 4000:
-            await query.delete_message()
+        if len(response) > MAX_MESSAGE_LENGTH:
+            await _tg_call(query.delete_message)
             await _send_long_message(query, response) # query tem message associada
         else:
-            await query.edit_message_text(response)
+            await _tg_call(lambda: query.edit_message_text(response))
 
     except Exception as e:
-        logger.error(f"Erro no callback: {e}")
-        await query.edit_message_text("❌ Ocorreu um erro no processamento.")
-        
+        logger.error("Erro no callback: %s", e)
+        await _settle_status(job)
+        await _tg_call(lambda: query.edit_message_text("❌ Ocorreu um erro no processamento."))
+
+
+def _set_status(job: _TranscriptionJob, text: str) -> None:
+    """
+    Edita a mensagem de status do job em segundo plano.
+
+    A edição é um round-trip ao Telegram que não precisa segurar o
+    download/Whisper/GPT. Cada edição espera a anterior do mesmo job,
+    então a ordem das mensagens se mantém.
+
+    Args:
+        job: Job cuja mensagem será editada.
+        text: Novo texto de status.
+    """
+    task = asyncio.create_task(_edit_status(job.query, text, job.status_task))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    job.status_task = task
+
+
+async def _edit_status(query, text: str, previous: asyncio.Task | None) -> None:
+    """Aplica uma edição de status depois da anterior (falhas só são logadas)."""
+    if previous is not None:
+        await asyncio.gather(previous, return_exceptions=True)
+    try:
+        await _tg_call(lambda: query.edit_message_text(text))
+    except Exception as e:
+        # Status é opcional: flood/"not modified" não interrompem o job
+        logger.debug("[TELEGRAM] Status não atualizado: %s", e)
+
+
+async def _settle_status(job: _TranscriptionJob) -> None:
+    """Aguarda as edições de status pendentes do job."""
+    if job.status_task is not None:
+        await asyncio.gather(job.status_task, return_exceptions=True)
+
+
+async def _post_process(post_key: tuple[str, str], text: str, on_progress) -> str:
+    """
+    Roda o pós-processamento GPT de um áudio e guarda o resultado no cache.
+
+    Executado como task compartilhada (ver _post_inflight): só a prévia
+    do primeiro pedido é exibida; os demais aguardam o texto final.
+
+    Args:
+        post_key: (file_unique_id, format_type).
+        text: Transcrição do Whisper.
+        on_progress: Callback da prévia em streaming.
+
+    Retorna:
+        Texto pós-processado.
+
+    Raises:
+        TranscriptionError: Se o GPT falhar (nada é guardado no cache).
+    """
+    gpt_start = time.monotonic()
+    try:
+        final_text = await post_process_transcription(text, post_key[1], on_progress=on_progress)
     finally:
-        if audio_path:
-            cleanup_file(audio_path)
+        metrics.observe("bot_latency_seconds", time.monotonic() - gpt_start, stage="post_process")
+    _post_cache[post_key] = final_text
+    return final_text
 
 
-def _format_transcription_response(result, final_text: str, format_type: str, elapsed: float) -> str:
+async def _transcribe_file(job: _TranscriptionJob):
     """
-    Formata a resposta final.
+    Baixa, prepara e transcreve um áudio, guardando o resultado no cache.
+
+    Depois do download, o conteúdo é identificado pelo SHA-256: o mesmo
+    áudio enviado como outro arquivo (ex: salvo e reenviado, com outro
+    file_unique_id) reaproveita a transcrição sem chamar o Whisper.
+
+    Args:
+        job: Áudio a transcrever.
+
+    Retorna:
+        TranscriptionResult do Whisper.
     """
-    titles = {
-        "raw": "Transcrição Crua",
-        "summary": "Resumo Executivo",
-        "minutes": "Ata Profissional",
-        "corrected": "Texto Corrigido"
-    }
-    
-    header = f"📝 {titles.get(format_type, 'Resultado')}"
-    
-    lines = [
-        header,
-        "─────────────────",
-        "",
-        final_text,
-        "",
-        "─────────────────",
-    ]
+    # Download e conversão (tudo em memória, sem arquivos temporários)
+    telegram_file = await job.bot.get_file(job.file_id)
+    audio = await download_and_prepare_audio(
+        telegram_file,
+        original_filename=job.original_filename,
+        duration=job.duration_hint,
+    )
+
+    content_key = "sha256:" + hashlib.sha256(audio.data).hexdigest()
+    result = _transcription_cache.get(content_key)
+    if result is not None:
+        metrics.inc("bot_cache_hits_total", cache="content")
+        logger.info("[CACHE] Conteúdo já transcrito (%s)", content_key[:19])
+    else:
+        # Transcrição Whisper
+        whisper_start = time.monotonic()
+        result = await transcribe_audio(
+            audio,
+            on_retry=lambda: _send_typing(job.bot, job.file_unique_id),
+        )
+        metrics.observe("bot_latency_seconds", time.monotonic() - whisper_start, stage="whisper")
+        _transcription_cache[content_key] = result
+
+    _transcription_cache[job.file_unique_id] = result
+    return result
 
-    lines.append(f"🌐 Idioma: {result.language_name}")
-    if result.duration > 0:
-        lines.append(f"⏱️ Duração: {format_duration(result.duration)}")
-    lines.append(f"⚡ Processado em: {format_duration(elapsed)}")
 
-    return "\n".join(lines)
+async def _send_typing(bot, file_unique_id: str) -> None:
+    """
+    Renova o "digitando..." em todos os chats que aguardam a transcrição.
+
+    Args:
+        bot: Bot do Telegram.
+        file_unique_id: Áudio cuja transcrição está em andamento.
+    """
+    chat_ids = _inflight_chats.get(file_unique_id, ())
+    await asyncio.gather(
+        *(bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING) for chat_id in chat_ids),
+        return_exceptions=True,
+    )
+
+
+async def _worker() -> None:
+    """Consome a fila de transcrições, um job por vez, para sempre."""
+    while True:
+        job = await _job_queue.get()
+        try:
+            await _process_job(job)
+        except Exception:
+            # _process_job já trata os erros esperados; isto só evita
+            # que uma falha inesperada derrube o worker
+            logger.exception("[WORKER] Falha não tratada em job de transcrição")
+        finally:
+            _job_queue.task_done()
+
+
+def _ensure_workers() -> None:
+    """
+    Cria a fila e os workers na primeira chamada.
+
+    Feito sob demanda (e não no import) porque precisam do event loop
+    do Application já rodando.
+    """
+    global _job_queue
+
+    if _job_queue is not None:
+        return
+
+    _job_queue = asyncio.Queue(maxsize=TRANSCRIPTION_QUEUE_SIZE)
+    for _ in range(TRANSCRIPTION_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+    logger.info("[WORKER] %d workers de transcrição iniciados", TRANSCRIPTION_WORKERS)
+
+
+async def stop_workers() -> None:
+    """
+    Cancela os workers da fila de transcrições (encerramento do bot).
 
+    Jobs ainda na fila são descartados; o usuário pode reenviar o áudio.
+    """
+    global _job_queue
 
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+    _job_queue = None
 
 
-def _escape_markdown_v2(text: str) -> str:
+def _format_transcription_response(result, final_text: str, format_type: str, elapsed: float) -> str:
     """
-    Escapa caracteres especiais do MarkdownV2 do Telegram.
+    Formata a resposta final.
+    """
+    language_line = f"🌐 Idioma: {result.language_name}\n"
+
+    duration_line = (
+        f"⏱️ Duração: {format_duration(result.duration)}\n" if result.duration > 0 else ""
+    )
+
+    return (
+        f"{_HEADERS.get(format_type, _DEFAULT_HEADER)}"
+        f"{final_text}"
+        f"{_FOOTER_START}"
+        f"{language_line}"
+        f"{duration_line}"
+        f"⚡ Processado em: {format_duration(elapsed)}"
+    )
 
-    O Telegram exige que certos caracteres sejam escapados
-    com backslash no modo MarkdownV2.
 
-    Referência: https://core.telegram.org/bots/api#markdownv2-style
+def _split_message(text: str, max_len: int):
+    """
+    Divide o texto em partes de até max_len caracteres.
+
+    Quebra preferencialmente no último newline da janela, depois no
+    último espaço. Trabalha com índices sobre o texto original — cada
+    parte é fatiada uma única vez, sem copiar o restante a cada volta.
 
     Args:
-        text: Texto a ser escapado.
+        text: Texto a ser dividido.
+        max_len: Tamanho máximo de cada parte.
 
     Retorna:
-        Texto com caracteres especiais escapados.
+        Gerador com as partes, na ordem.
     """
-    # Caracteres que precisam de escape no MarkdownV2
-    special_chars = [
-        '_', '*', '[', ']', '(', ')', '~', '`',
-        '>', '#', '+', '-', '=', '|', '{', '}',
-        '.', '!'
-    ]
+    start = 0
+    length = len(text)
 
-    for char in special_chars:
-        text = text.replace(char, f"\\{char}")
+    while start < length:
+        if length - start <= max_len:
+            yield text[start:]
+            return
 
-    return text
+        # Encontra o último espaço ou newline antes do limite
+        end = start + max_len
+        split_pos = text.rfind("\n", start, end)
+        if split_pos <= start:
+            split_pos = text.rfind(" ", start, end)
+        if split_pos <= start:
+            split_pos = end
+
+        yield text[start:split_pos]
+
+        # Pula o espaço em branco do ponto de quebra (equivale ao lstrip)
+        start = split_pos
+        while start < length and text[start].isspace():
+            start += 1
 
 
 async def _send_long_message(update_or_query, text: str) -> None:
     """
     Envia mensagens longas divididas em partes de 4000 caracteres.
-    Suporta tanto Update quanto CallbackQuery.
+    Suporta tanto Update quanto CallbackQuery (ambos têm .message).
+
+    As partes saem espaçadas por LONG_MESSAGE_INTERVAL, abaixo do
+    limite de ~30 mensagens/s do Telegram; se ainda assim vier um
+    429, _tg_call espera e tenta de novo.
     """
-    max_len = 4000
-    
-    # Define a função de envio baseada no tipo de objeto
-    async def send_chunk(chunk):
-        if hasattr(update_or_query, "message") and update_or_query.message:
-             # É um CallbackQuery ou Update com message
-             # Se for CallbackQuery, usamos message.reply_text
-             target = update_or_query.message
-             await target.reply_text(chunk)
-        else:
-             # É um Update direto
-             await update_or_query.message.reply_text(chunk)
+    target = update_or_query.message
+
+    for index, chunk in enumerate(_split_message(text, MAX_MESSAGE_LENGTH)):
+        if index:
+            await asyncio.sleep(LONG_MESSAGE_INTERVAL)
+        await _tg_call(lambda: target.reply_text(chunk))
 
-    while text:
-        if len(text) <= max_len:
-            await send_chunk(text)
-            break
-        
-        # Encontra o último espaço ou newline antes do limite
-        split_pos = text.rfind("\n", 0, max_len)
-        if split_pos == -1:
-            split_pos = text.rfind(" ", 0, max_len)
-        if split_pos == -1:
-            split_pos = max_len
-
-        chunk = text[:split_pos]
-        text = text[split_pos:].lstrip()
-        
-        await send_chunk(chunk)
+
+async def _tg_call(
+    coro_factory,
+    max_retries: int = 5,
+    base: float = 1.0,
+    cap: float = 32.0,
+    jitter: float = 0.5,
+):
+    """
+    Executa uma chamada à API do Telegram com retry em caso de flood (429).
+
+    O Telegram limita o bot a ~30 mensagens/s e responde RetryAfter
+    quando o limite é excedido. Espera com backoff exponencial + jitter
+    (nunca menos do que o retry_after pedido pelo Telegram), para que
+    vários chats atingidos ao mesmo tempo não voltem todos juntos.
+
+    Args:
+        coro_factory: Função sem argumentos que cria a corrotina
+                      (uma nova a cada tentativa).
+        max_retries: Número máximo de novas tentativas.
+        base: Espera base em segundos (dobra a cada tentativa).
+        cap: Espera máxima do backoff em segundos.
+        jitter: Aleatoriedade máxima somada à espera, em segundos.
+
+    Retorna:
+        O resultado da chamada.
+
+    Raises:
+        RetryAfter: Se o limite persistir após todas as tentativas.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await coro_factory()
+        except RetryAfter as e:
+            if attempt == max_retries:
+                raise
+            delay = min(cap, base * 2 ** attempt) + random.random() * jitter
+            delay = max(delay, e.retry_after)
+            logger.warning(
+                "[TELEGRAM] Flood control, nova tentativa em %.1fs (%d/%d)",
+                delay, attempt + 1, max_retries,
+            )
+            await asyncio.sleep(delay)
 
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -580,7 +1023,8 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
     Importante para debugging em produção.
     """
     logger.exception(
-        f"[ERRO GLOBAL] Exceção não tratada: {context.error}",
+        "[ERRO GLOBAL] Exceção não tratada: %s",
+        context.error,
         exc_info=context.error,
     )
 
@@ -603,6 +1047,48 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> N
             pass  # Se não conseguir notificar, apenas loga
 
 
+class _AudioDocumentFilter(filters.MessageFilter):
+    """
+    Aceita documentos cujo MIME type é de áudio (ou vídeo com áudio).
+
+    Uma única busca num frozenset, em vez de uma cadeia de 14
+    filters.Document.MimeType combinados com | avaliada a cada update.
+
+    Fallback pela extensão: alguns clientes enviam áudio como
+    "application/octet-stream" (ou sem MIME); se o nome do arquivo
+    terminar num formato suportado, o documento também é aceito.
+    """
+
+    MIME_TYPES = frozenset({
+        "audio/mpeg",
+        "audio/mp3",
+        "audio/ogg",
+        "audio/wav",
+        "audio/x-wav",
+        "audio/flac",
+        "audio/aac",
+        "audio/m4a",
+        "audio/mp4",
+        "audio/x-m4a",
+        "audio/webm",
+        "audio/opus",
+        "video/mp4",  # Vídeos podem ter áudio
+        "video/webm",
+    })
+
+    def filter(self, message) -> bool:
+        document = message.document
+        if not document:
+            return False
+        if document.mime_type in self.MIME_TYPES:
+            return True
+
+        file_name = document.file_name
+        if not file_name or "." not in file_name:
+            return False
+        return file_name.rpartition(".")[2].lower() in SUPPORTED_FORMATS
+
+
 def setup_handlers(application: Application) -> None:
     """
     Registra todos os handlers no application do Telegram.
@@ -628,25 +1114,7 @@ def setup_handlers(application: Application) -> None:
     application.add_handler(MessageHandler(filters.AUDIO, audio_handler))
 
     # Documentos que podem ser áudio (enviados como arquivo)
-    application.add_handler(
-        MessageHandler(
-            filters.Document.MimeType("audio/mpeg")
-            | filters.Document.MimeType("audio/mp3")
-            | filters.Document.MimeType("audio/ogg")
-            | filters.Document.MimeType("audio/wav")
-            | filters.Document.MimeType("audio/x-wav")
-            | filters.Document.MimeType("audio/flac")
-            | filters.Document.MimeType("audio/aac")
-            | filters.Document.MimeType("audio/m4a")
-            | filters.Document.MimeType("audio/mp4")
-            | filters.Document.MimeType("audio/x-m4a")
-            | filters.Document.MimeType("audio/webm")
-            | filters.Document.MimeType("audio/opus")
-            | filters.Document.MimeType("video/mp4")  # Vídeos podem ter áudio
-            | filters.Document.MimeType("video/webm"),
-            audio_handler,
-        )
-    )
+    application.add_handler(MessageHandler(_AudioDocumentFilter(), audio_handler))
 
     # Handler global de erros
     application.add_error_handler(error_handler)
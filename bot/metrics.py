@@ -0,0 +1,86 @@
+"""
+bot/metrics.py - Métricas de uso e latência do bot.
+
+Contadores e latências mantidos em memória e expostos no formato
+texto do Prometheus pelo servidor de health check (GET /metrics).
+Sem dependências externas: o bot tem um único processo e tanto os
+handlers quanto o servidor de health check rodam no mesmo event loop,
+então dicionários simples bastam (nenhum lock é necessário — as
+funções são síncronas e nunca são interrompidas no meio).
+
+Métricas:
+    bot_requests_total{kind, outcome}   — áudios/autenticações admitidos ou negados
+    bot_cache_hits_total{cache}         — acertos nos caches de transcrição/GPT
+    bot_latency_seconds{stage}          — soma e contagem por etapa do pipeline
+
+Uso:
+    from bot import metrics
+
+    metrics.inc("bot_requests_total", kind="audio", outcome="admitted")
+    metrics.observe("bot_latency_seconds", 12.3, stage="whisper")
+"""
+
+# {(nome, ((label, valor), ...)): valor}
+_counters: dict[tuple[str, tuple], float] = {}
+
+# {(nome, labels): [soma, contagem]}
+_summaries: dict[tuple[str, tuple], list[float]] = {}
+
+
+def inc(name: str, amount: float = 1.0, **labels: str) -> None:
+    """
+    Incrementa um contador.
+
+    Args:
+        name: Nome da métrica (ex: "bot_requests_total").
+        amount: Valor a somar.
+        **labels: Labels da série (ex: kind="audio").
+    """
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0.0) + amount
+
+
+def observe(name: str, value: float, **labels: str) -> None:
+    """
+    Registra uma observação (ex: latência em segundos) num summary.
+
+    Args:
+        name: Nome da métrica (ex: "bot_latency_seconds").
+        value: Valor observado.
+        **labels: Labels da série (ex: stage="whisper").
+    """
+    key = (name, tuple(sorted(labels.items())))
+    summary = _summaries.get(key)
+    if summary is None:
+        _summaries[key] = [value, 1]
+    else:
+        summary[0] += value
+        summary[1] += 1
+
+
+def _format_labels(labels: tuple) -> str:
+    """Formata labels no estilo Prometheus: {a="1",b="2"}."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def render() -> str:
+    """
+    Exporta todas as métricas no formato texto do Prometheus.
+
+    Retorna:
+        Texto pronto para servir em /metrics.
+    """
+    counters = sorted(_counters.items())
+    summaries = sorted((key, tuple(value)) for key, value in _summaries.items())
+
+    lines = []
+    for (name, labels), value in counters:
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+    for (name, labels), (total, count) in summaries:
+        label_text = _format_labels(labels)
+        lines.append(f"{name}_sum{label_text} {total:g}")
+        lines.append(f"{name}_count{label_text} {count:g}")
+
+    return "\n".join(lines) + "\n"
@@ -98,3 +98,11 @@ RETORNE: Apenas o texto corrigido. Zero comentários.
 TRANSCRIÇÃO ORIGINAL:
 {transcription_text}"""
 }
+
+# Templates já divididos no placeholder: {formato: (prefixo, sufixo)}.
+# Montar o prompt vira uma concatenação, sem varrer o template inteiro
+# procurando "{transcription_text}" a cada chamada.
+PROMPT_PARTS = {
+    format_type: tuple(template.split("{transcription_text}", 1))
+    for format_type, template in PROMPTS.items()
+}
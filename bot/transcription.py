@@ -7,35 +7,51 @@ com detecção automática de idioma.
 Configuração de MÁXIMA PRECISÃO:
     - temperature=0: Zero criatividade, apenas o que foi dito
     - language=None: Detecção automática (não força idioma)
-    - response_format='verbose_json': Retorna idioma + segmentos
+    - response_format='verbose_json': Retorna idioma + duração
     - Sem prompt: Evita viés/indução na transcrição
 
-Detecção multilíngue:
-    O Whisper detecta O IDIOMA PREDOMINANTE do áudio.
-    Para detecção de múltiplos idiomas em um só áudio,
-    analisamos os segmentos individuais (cada segmento
-    tem ~30s e pode ter idioma diferente detectado).
+Detecção de idioma:
+    O Whisper detecta O IDIOMA PREDOMINANTE do áudio, nos dois
+    backends. Nem a API nem o faster-whisper informam idioma por
+    segmento, então áudios com mais de um idioma aparecem com o
+    predominante.
+
+Backends (WHISPER_BACKEND):
+    openai — API Whisper (padrão). Retry com backoff em erros de rede.
+    local  — faster-whisper (CTranslate2, int8) no próprio processo:
+             sem upload nem custo por minuto. O modelo é carregado
+             na primeira transcrição e reaproveitado depois.
 
 Custos:
     Whisper: $0.006 por minuto de áudio
     Exemplo: 5 minutos de áudio = $0.03
+    Local: só CPU/RAM do servidor
 
 Uso:
     from bot.transcription import transcribe_audio
 
-    result = await transcribe_audio("caminho/do/audio.mp3")
+    audio = await download_and_prepare_audio(telegram_file)
+    result = await transcribe_audio(audio)
     print(result['text'])       # Texto transcrito
     print(result['language'])   # Idioma principal
 """
 
 import asyncio
+import functools
+import io
 import logging
-from dataclasses import dataclass, field
-
-from openai import OpenAI, APIError, APITimeoutError
-
-from bot.prompts import PROMPTS
-from bot.utils import get_language_name, format_duration
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, APIError, APITimeoutError
+
+from bot.audio_processor import PreparedAudio
+from bot.prompts import PROMPT_PARTS
+from bot.utils import format_duration, format_file_size, get_language_name
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -50,6 +66,58 @@ MAX_RETRIES = 3
 # Tempo base de espera entre retries (dobra a cada tentativa)
 BASE_RETRY_DELAY = 2.0
 
+# Teto da espera entre retries e jitter máximo somado a ela (segundos).
+# O jitter evita que vários áudios que falharam juntos (ex: 429 da
+# OpenAI) voltem todos no mesmo instante.
+MAX_RETRY_DELAY = 10.0
+RETRY_JITTER = 0.5
+
+# Erros 4xx nunca se resolvem tentando de novo (requisição inválida,
+# chave errada/sem permissão, modelo inexistente, arquivo grande demais,
+# formato não suportado...), exceto o rate limit
+RETRYABLE_CLIENT_STATUS = frozenset({429})
+
+# Retries do SDK para o pós-processamento GPT (mesmo padrão do SDK)
+GPT_MAX_RETRIES = 2
+
+# Intervalo mínimo (segundos) entre atualizações parciais do GPT em
+# streaming — cada uma vira uma edição de mensagem no Telegram
+STREAM_PROGRESS_INTERVAL = 1.0
+
+# Máximo de conexões simultâneas com a API da OpenAI
+MAX_HTTP_CONNECTIONS = 32
+
+# Pool HTTP compartilhado por todas as chamadas à OpenAI (Whisper e GPT).
+# Transcrições concorrentes reaproveitam conexões TCP/TLS já abertas
+# em vez de pagar um handshake novo a cada áudio.
+_http_client = DefaultAsyncHttpxClient(
+    limits=httpx.Limits(
+        max_connections=MAX_HTTP_CONNECTIONS,
+        max_keepalive_connections=MAX_HTTP_CONNECTIONS,
+    ),
+)
+
+
+# Limita quantas transcrições rodam ao mesmo tempo (API ou modelo local).
+# Download e conversão seguem livres; só a etapa cara é controlada.
+_WHISPER_SEMAPHORE = asyncio.Semaphore(settings.WHISPER_MAX_CONCURRENCY)
+
+# Backend "local": áudios curtos vão para modelos menores, bem mais
+# rápidos e com perda de qualidade desprezível em notas de voz de
+# poucos segundos. (duração máxima em segundos, modelo); acima do
+# último limite, ou com duração desconhecida, usa WHISPER_MODEL_SIZE.
+LOCAL_MODEL_ROUTES = ((15, "tiny"), (120, "base"))
+
+# Modelos do faster-whisper do mais rápido ao mais lento. Uma rota só
+# é usada se for mais rápida que o modelo configurado (tamanhos fora
+# desta lista, como large-v3, contam como os mais lentos).
+_MODEL_SIZES_BY_SPEED = ("tiny", "base", "small", "medium")
+
+# Modelos do faster-whisper carregados sob demanda: {tamanho: WhisperModel}.
+# O lock evita que duas transcrições simultâneas carreguem o mesmo modelo duas vezes.
+_whisper_models: dict[str, object] = {}
+_whisper_model_lock = threading.Lock()
+
 
 @dataclass
 class TranscriptionResult:
@@ -60,16 +128,12 @@ class TranscriptionResult:
         text: Texto transcrito completo.
         language: Código do idioma principal (ex: "pt", "en").
         language_name: Nome legível do idioma (ex: "🇧🇷 Português").
-        detected_languages: Lista de idiomas detectados (se multilíngue).
-        is_multilingual: True se mais de um idioma foi detectado.
         duration: Duração do áudio em segundos.
     """
 
     text: str
     language: str
     language_name: str = ""
-    detected_languages: list[str] = field(default_factory=list)
-    is_multilingual: bool = False
     duration: float = 0.0
 
     def __post_init__(self):
@@ -91,60 +155,64 @@ class TranscriptionError(Exception):
         super().__init__(user_message)
 
 
-def _detect_languages_from_segments(segments: list[dict]) -> list[str]:
+@functools.lru_cache(maxsize=1)
+def _get_client() -> AsyncOpenAI:
     """
-    Analisa segmentos para detectar múltiplos idiomas.
-
-    O Whisper retorna segmentos de ~30s cada um. Cada segmento
-    pode ter um idioma diferente detectado via heurística.
+    Retorna o cliente OpenAI do processo (criado na primeira chamada).
 
-    Nota: Na prática, Whisper retorna apenas o idioma principal.
-    Os segmentos não contêm idioma individualmente na API atual.
-    Para detecção multilíngue real, comparamos o idioma detectado
-    com sinais no texto (caracteres especiais, padrões de palavras).
+    Cliente assíncrono: as chamadas são aguardadas direto no event
+    loop, sem ocupar uma thread do pool por requisição em andamento.
 
-    Args:
-        segments: Lista de segmentos do verbose_json.
+    Usa a chave da API definida nas settings.
+    Timeout configurado para áudios longos.
+    Um único cliente para todas as chamadas, sobre o pool de conexões
+    compartilhado. Para recriá-lo (ex: em testes): _get_client.cache_clear().
 
-    Retorna:
-        Lista de códigos de idiomas detectados.
+    max_retries=0: o retry do Whisper é o loop de transcribe_audio
+    (com backoff próprio) — sem isso, o SDK repetiria cada tentativa
+    mais 2 vezes por baixo, multiplicando as chamadas.
     """
-    # Whisper retorna idioma no nível do áudio inteiro, não por segmento.
-    # Retornamos lista vazia — o idioma principal vem da resposta top-level.
-    return []
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        timeout=WHISPER_TIMEOUT,
+        max_retries=0,
+        http_client=_http_client,
+    )
 
 
-def _create_openai_client() -> OpenAI:
+async def close_client() -> None:
     """
-    Cria e retorna um cliente OpenAI configurado.
+    Fecha o pool HTTP compartilhado (encerramento do bot).
 
-    Usa a chave da API definida nas settings.
-    Timeout configurado para áudios longos.
+    As conexões keep-alive com a OpenAI são fechadas de forma limpa
+    em vez de ficarem abertas até o processo morrer.
     """
-    return OpenAI(
-        api_key=settings.OPENAI_API_KEY,
-        timeout=WHISPER_TIMEOUT,
-    )
+    await _http_client.aclose()
+    _get_client.cache_clear()
 
 
-async def transcribe_audio(file_path: str) -> TranscriptionResult:
+async def transcribe_audio(
+    audio: PreparedAudio,
+    on_retry: Callable[[], Awaitable[None]] | None = None,
+) -> TranscriptionResult:
     """
     Transcreve um arquivo de áudio usando a API Whisper.
 
     Pipeline:
-        1. Abre o arquivo de áudio
+        1. Recebe o áudio já em memória (sem reler do disco)
         2. Envia para Whisper com configuração de máxima precisão
         3. Extrai idioma detectado e texto
-        4. Analisa segmentos para detecção multilíngue
-        5. Retry automático com backoff exponencial em caso de erro
+        4. Retry automático com backoff exponencial (com teto e jitter)
 
     Configuração de precisão:
         - temperature=0: Saída determinística, sem "criatividade"
         - language=None: Whisper detecta o idioma automaticamente
-        - verbose_json: Retorna metadados completos (idioma, duração, segments)
+        - verbose_json: Retorna metadados completos (idioma, duração)
 
     Args:
-        file_path: Caminho do arquivo de áudio (preferencialmente MP3).
+        audio: Áudio preparado por download_and_prepare_audio.
+        on_retry: Chamado antes de cada espera entre tentativas
+            (ex: renovar o indicador "digitando..." no chat).
 
     Retorna:
         TranscriptionResult: Objeto com texto, idioma e metadados.
@@ -152,56 +220,63 @@ async def transcribe_audio(file_path: str) -> TranscriptionResult:
     Raises:
         TranscriptionError: Se todas as tentativas falharem.
     """
-    client = _create_openai_client()
+    if settings.WHISPER_BACKEND == "local":
+        return await _transcribe_local(audio)
+
+    client = _get_client()
     last_error: Exception | None = None
 
     for attempt in range(1, MAX_RETRIES + 1):
         try:
             logger.info(
-                f"[WHISPER] Iniciando transcrição (tentativa {attempt}/{MAX_RETRIES}): "
-                f"{file_path}"
+                "[WHISPER] Iniciando transcrição (tentativa %d/%d): %s (%s)",
+                attempt, MAX_RETRIES, audio.filename, format_file_size(len(audio.data)),
             )
 
-            # Executa a chamada síncrona da OpenAI em thread separada
-            # para não bloquear o event loop do asyncio
-            result = await asyncio.to_thread(
-                _call_whisper_api, client, file_path
-            )
+            async with _WHISPER_SEMAPHORE:
+                result = await _call_whisper_api(client, audio)
 
             return result
 
         except APITimeoutError as e:
             last_error = e
             logger.warning(
-                f"[WHISPER] Timeout na tentativa {attempt}/{MAX_RETRIES}: {e}"
+                "[WHISPER] Timeout na tentativa %d/%d: %s", attempt, MAX_RETRIES, e
             )
 
         except APIError as e:
             last_error = e
+            # APIConnectionError também é APIError, mas sem status_code
+            status = getattr(e, "status_code", None)
             logger.error(
-                f"[WHISPER] Erro da API na tentativa {attempt}/{MAX_RETRIES}: "
-                f"status={e.status_code}, message={e.message}"
+                "[WHISPER] Erro da API na tentativa %d/%d: status=%s, message=%s",
+                attempt, MAX_RETRIES, status, e.message,
             )
 
-            # Erros 4xx (exceto 429) não fazem sentido retry
-            if e.status_code and 400 <= e.status_code < 500 and e.status_code != 429:
+            if status and 400 <= status < 500 and status not in RETRYABLE_CLIENT_STATUS:
                 break
 
         except Exception as e:
             last_error = e
             logger.error(
-                f"[WHISPER] Erro inesperado na tentativa {attempt}/{MAX_RETRIES}: {e}"
+                "[WHISPER] Erro inesperado na tentativa %d/%d: %s", attempt, MAX_RETRIES, e
             )
 
-        # Backoff exponencial: 2s, 4s, 8s...
+        # Backoff exponencial com teto: 2s, 4s, 8s, 10s... + jitter
         if attempt < MAX_RETRIES:
-            delay = BASE_RETRY_DELAY * (2 ** (attempt - 1))
-            logger.info(f"[WHISPER] Aguardando {delay}s antes de retry...")
+            delay = min(BASE_RETRY_DELAY * (1 << (attempt - 1)), MAX_RETRY_DELAY)
+            delay += random.uniform(0, RETRY_JITTER)
+            logger.info("[WHISPER] Aguardando %.1fs antes de retry...", delay)
+            if on_retry is not None:
+                try:
+                    await on_retry()
+                except Exception as e:
+                    logger.debug("[WHISPER] Falha no aviso de retry: %s", e)
             await asyncio.sleep(delay)
 
     # Todas as tentativas falharam
     error_detail = str(last_error) if last_error else "Erro desconhecido"
-    logger.error(f"[WHISPER] Todas as {MAX_RETRIES} tentativas falharam: {error_detail}")
+    logger.error("[WHISPER] Todas as %d tentativas falharam: %s", MAX_RETRIES, error_detail)
 
     if isinstance(last_error, APITimeoutError):
         raise TranscriptionError(
@@ -217,95 +292,248 @@ async def transcribe_audio(file_path: str) -> TranscriptionResult:
     )
 
 
-def _call_whisper_api(client: OpenAI, file_path: str) -> TranscriptionResult:
+async def _call_whisper_api(client: AsyncOpenAI, audio: PreparedAudio) -> TranscriptionResult:
     """
-    Chamada síncrona à API Whisper (executada em thread separada).
-
-    Esta função é síncrona porque o cliente OpenAI Python
-    não tem versão async nativa para transcrição. Usamos
-    asyncio.to_thread() para não bloquear o event loop.
+    Chamada à API Whisper (uma tentativa).
 
     Args:
         client: Cliente OpenAI configurado.
-        file_path: Caminho do arquivo de áudio.
+        audio: Áudio em memória (conteúdo + nome com a extensão).
 
     Retorna:
         TranscriptionResult com texto e metadados.
     """
-    with open(file_path, "rb") as audio_file:
-        response = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=audio_file,
-            response_format="verbose_json",
-            temperature=settings.WHISPER_TEMPERATURE,
-            # language=None → auto-detect (não passamos o parâmetro)
-            # prompt=None → sem indução (evita alucinações)
-        )
+    # Upload multipart direto da memória: (nome, conteúdo). O nome
+    # só serve para a API identificar o formato pela extensão.
+    response = await client.audio.transcriptions.create(
+        model="whisper-1",
+        file=(audio.filename, audio.data),
+        response_format="verbose_json",
+        temperature=settings.WHISPER_TEMPERATURE,
+        # language=None → auto-detect (não passamos o parâmetro)
+        # prompt=None → sem indução (evita alucinações)
+    )
 
     # Extrai dados da resposta
     text = response.text.strip()
     language = getattr(response, "language", "unknown")
-    duration = getattr(response, "duration", 0.0)
-    segments = getattr(response, "segments", [])
-
-    # Detecta múltiplos idiomas via segmentos
-    segment_languages = _detect_languages_from_segments(segments)
-    all_languages = [language] + [
-        lang for lang in segment_languages if lang != language
-    ]
-    is_multilingual = len(set(all_languages)) > 1
+    # Duração original (Telegram) tem prioridade: a conversão encurta
+    # pausas longas, então a do Whisper pode ser menor que a real
+    duration = audio.duration or getattr(response, "duration", 0.0)
 
     logger.info(
-        f"[WHISPER] Transcrição concluída: "
-        f"idioma={language}, "
-        f"duração={format_duration(duration)}, "
-        f"caracteres={len(text)}, "
-        f"multilíngue={is_multilingual}"
+        "[WHISPER] Transcrição concluída: idioma=%s, duração=%s, caracteres=%d",
+        language,
+        format_duration(duration),
+        len(text),
     )
 
     return TranscriptionResult(
         text=text,
         language=language,
-        detected_languages=list(dict.fromkeys(all_languages)),  # unique, order preserved
-        is_multilingual=is_multilingual,
         duration=duration,
     )
 
 
-async def post_process_transcription(text: str, format_type: str) -> str:
+def _model_size_for(duration: float) -> str:
+    """
+    Escolhe o modelo local pela duração do áudio (ver LOCAL_MODEL_ROUTES).
+
+    Args:
+        duration: Duração em segundos (0 se desconhecida).
+
+    Retorna:
+        Tamanho do modelo do faster-whisper.
+    """
+    configured = settings.WHISPER_MODEL_SIZE
+    if duration <= 0:
+        return configured
+
+    def rank(size: str) -> int:
+        if size in _MODEL_SIZES_BY_SPEED:
+            return _MODEL_SIZES_BY_SPEED.index(size)
+        return len(_MODEL_SIZES_BY_SPEED)
+
+    for max_duration, size in LOCAL_MODEL_ROUTES:
+        if duration < max_duration:
+            return size if rank(size) < rank(configured) else configured
+
+    return configured
+
+
+def _get_whisper_model(model_size: str):
+    """
+    Retorna o modelo do faster-whisper, carregando-o na primeira chamada.
+
+    O import é feito aqui (e não no topo do módulo) porque o pacote
+    só é necessário no backend "local" — no backend "openai" ele nem
+    precisa estar instalado.
+
+    compute_type="int8": quantização que roda bem em CPU (e em GPU),
+    com ~metade da RAM do modelo em float32 e perda de precisão mínima.
+
+    Args:
+        model_size: Tamanho do modelo (ex: "tiny", "small").
+    """
+    with _whisper_model_lock:
+        model = _whisper_models.get(model_size)
+        if model is None:
+            from faster_whisper import WhisperModel
+
+            logger.info("[WHISPER] Carregando modelo local '%s'...", model_size)
+            model = WhisperModel(
+                model_size,
+                device="auto",
+                compute_type="int8",
+            )
+            _whisper_models[model_size] = model
+            logger.info("[WHISPER] Modelo local '%s' carregado", model_size)
+
+    return model
+
+
+def _call_local_whisper(audio: PreparedAudio) -> TranscriptionResult:
+    """
+    Transcrição síncrona com faster-whisper (executada em thread separada).
+
+    Mesma configuração de precisão da API: temperatura das settings,
+    sem prompt e idioma detectado automaticamente. O filtro VAD pula
+    trechos sem fala antes de passar pelo modelo.
+
+    O modelo é escolhido pela duração informada pelo Telegram
+    (ver _model_size_for).
+
+    Args:
+        audio: Áudio em memória (decodificado pelo próprio faster-whisper).
+
+    Retorna:
+        TranscriptionResult com texto e metadados.
+    """
+    model_size = _model_size_for(audio.duration)
+    model = _get_whisper_model(model_size)
+
+    segments, info = model.transcribe(
+        io.BytesIO(audio.data),
+        temperature=settings.WHISPER_TEMPERATURE,
+        beam_size=5,
+        vad_filter=True,
+    )
+
+    # segments é um gerador: a transcrição acontece durante a iteração
+    text = "".join(segment.text for segment in segments).strip()
+
+    logger.info(
+        "[WHISPER] Transcrição local concluída: modelo=%s, idioma=%s, "
+        "duração=%s, caracteres=%d",
+        model_size,
+        info.language,
+        format_duration(info.duration),
+        len(text),
+    )
+
+    return TranscriptionResult(
+        text=text,
+        language=info.language,
+        duration=audio.duration or info.duration,
+    )
+
+
+async def _transcribe_local(audio: PreparedAudio) -> TranscriptionResult:
+    """
+    Transcreve com o backend local (faster-whisper).
+
+    Sem retry: não há rede envolvida, então uma falha aqui não
+    se resolve tentando de novo.
+
+    Args:
+        audio: Áudio preparado por download_and_prepare_audio.
+
+    Retorna:
+        TranscriptionResult: Objeto com texto, idioma e metadados.
+
+    Raises:
+        TranscriptionError: Se a transcrição falhar.
+    """
+    try:
+        # Inferência é CPU-bound e síncrona: roda em thread separada
+        # para não bloquear o event loop do asyncio
+        async with _WHISPER_SEMAPHORE:
+            return await asyncio.to_thread(_call_local_whisper, audio)
+    except Exception as e:
+        logger.error("[WHISPER] Erro na transcrição local: %s", e)
+        raise TranscriptionError(
+            "❌ Erro ao transcrever o áudio.\n"
+            "💡 Tente novamente em alguns instantes.",
+            technical_detail=str(e),
+        ) from e
+
+
+async def post_process_transcription(
+    text: str,
+    format_type: str,
+    on_progress: Callable[[str], Awaitable[None]] | None = None,
+) -> str:
     """
     Processa a transcrição com GPT-4o-mini para o formato desejado.
 
+    A resposta vem em streaming: se on_progress for informado, ele é
+    chamado com o texto parcial a cada STREAM_PROGRESS_INTERVAL
+    segundos — o usuário vê o resumo/ata sendo escrito em vez de
+    esperar a resposta inteira.
+
     Args:
         text: Texto original da transcrição.
         format_type: 'summary', 'minutes' ou 'corrected'.
+        on_progress: Corrotina opcional que recebe o texto parcial.
 
     Retorna:
         Texto processado no formato solicitado.
+
+    Raises:
+        TranscriptionError: Se a chamada ao GPT falhar.
     """
-    if format_type not in PROMPTS:
+    if format_type not in PROMPT_PARTS:
         return text  # Se não houver prompt, retorna original (fallback)
 
-    client = _create_openai_client()
-    prompt = PROMPTS[format_type].replace("{transcription_text}", text)
+    # O GPT não tem loop de retry próprio: mantém o retry padrão do SDK
+    client = _get_client().with_options(max_retries=GPT_MAX_RETRIES)
+    prefix, suffix = PROMPT_PARTS[format_type]
+    prompt = prefix + text + suffix
 
     try:
-        logger.info(f"[GPT] Processando formato '{format_type}' com gpt-4o-mini")
-        
-        # Chamada síncrona em thread separada
-        response = await asyncio.to_thread(
-            client.chat.completions.create,
+        logger.info("[GPT] Processando formato '%s' com gpt-4o-mini", format_type)
+
+        stream = await client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "Assistant de processamento de texto corporativo."},
                 {"role": "user", "content": prompt}
             ],
             temperature=0.2, # Baixa criatividade para manter fidelidade
-            max_tokens=1500
+            max_tokens=1500,
+            stream=True,
         )
-        
-        return response.choices[0].message.content.strip()
+
+        parts: list[str] = []
+        last_progress = time.monotonic()
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+
+            now = time.monotonic()
+            if on_progress and now - last_progress >= STREAM_PROGRESS_INTERVAL:
+                last_progress = now
+                await on_progress("".join(parts))
+
+        return "".join(parts).strip()
 
     except Exception as e:
-        logger.error(f"[GPT] Erro no processamento: {e}")
-        return f"⚠️ Erro ao gerar {format_type}. Segue transcrição original:\n\n{text}"
+        logger.error("[GPT] Erro no processamento: %s", e)
+        raise TranscriptionError(
+            f"⚠️ Erro ao gerar {format_type}. Segue transcrição original:",
+            technical_detail=str(e),
+        ) from e
@@ -11,7 +11,10 @@ Uso:
 import logging
 import os
 import tempfile
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any
 
 from config.settings import settings
 
@@ -66,7 +69,9 @@ def get_language_name(code: str) -> str:
         >>> get_language_name("xyz")
         'XYZ'
     """
-    return LANGUAGE_NAMES.get(code, code.upper())
+    # code.upper() só é calculado para códigos não mapeados
+    name = LANGUAGE_NAMES.get(code)
+    return name if name is not None else code.upper()
 
 
 def format_duration(seconds: float) -> str:
@@ -106,6 +111,10 @@ def format_duration(seconds: float) -> str:
     return " ".join(parts)
 
 
+# (deslocamento em bits, sufixo) — 1 << 30 = 1GB, 1 << 20 = 1MB, 1 << 10 = 1KB
+_SIZE_UNITS = ((30, "GB"), (20, "MB"), (10, "KB"))
+
+
 def format_file_size(size_bytes: int) -> str:
     """
     Formata tamanho em bytes para formato legível.
@@ -122,32 +131,42 @@ def format_file_size(size_bytes: int) -> str:
         >>> format_file_size(524288)
         '512.0KB'
     """
-    if size_bytes < 1024:
-        return f"{size_bytes}B"
-    if size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.1f}KB"
-    return f"{size_bytes / (1024 * 1024):.1f}MB"
+    # Maior unidade primeiro: size >> shift é não-zero a partir de 1 unidade
+    for shift, suffix in _SIZE_UNITS:
+        if size_bytes >> shift:
+            return f"{size_bytes / (1 << shift):.1f}{suffix}"
+    return f"{size_bytes}B"
 
 
-def get_temp_filepath(extension: str = "mp3") -> str:
+def write_temp_file(data: bytes, extension: str = "mp3") -> str:
     """
-    Gera um caminho temporário seguro para arquivos de áudio.
+    Grava dados num arquivo temporário seguro e retorna o caminho.
 
     Usa o diretório temp/ do projeto (configurável via settings).
     Arquivos temporários são nomeados com sufixo único pelo OS.
 
+    A escrita usa o próprio descritor aberto pelo mkstemp — sem
+    fechar e reabrir o arquivo pelo caminho.
+
     Args:
+        data: Conteúdo a gravar.
         extension: Extensão do arquivo (sem ponto). Padrão: "mp3".
 
     Retorna:
         Caminho absoluto para o arquivo temporário.
+        Quem chama é responsável por removê-lo (cleanup_file).
     """
     temp_dir = Path(settings.TEMP_DIR)
     temp_dir.mkdir(parents=True, exist_ok=True)
 
     # tempfile gera nome único automaticamente
     fd, filepath = tempfile.mkstemp(suffix=f".{extension}", dir=str(temp_dir))
-    os.close(fd)  # Fecha o file descriptor (só precisamos do path)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+    except OSError:
+        cleanup_file(filepath)
+        raise
 
     return filepath
 
@@ -165,9 +184,9 @@ def cleanup_file(filepath: str) -> None:
     try:
         if filepath and os.path.exists(filepath):
             os.remove(filepath)
-            logger.debug(f"Arquivo temporário removido: {filepath}")
+            logger.debug("Arquivo temporário removido: %s", filepath)
     except OSError as e:
-        logger.warning(f"Falha ao remover arquivo temporário {filepath}: {e}")
+        logger.warning("Falha ao remover arquivo temporário %s: %s", filepath, e)
 
 
 def mask_user_id(user_id: int | str) -> str:
@@ -185,3 +204,76 @@ def mask_user_id(user_id: int | str) -> str:
     if len(s_id) <= 4:
         return "****"
     return f"{s_id[:2]}***{s_id[-3:]}"
+
+
+class TTLCache:
+    """
+    Dicionário com tamanho máximo e expiração por tempo (TTL).
+
+    Usado para o estado em memória do bot (rate limit, tentativas de
+    login, cache de áudio), que antes crescia sem limite em processos
+    de longa duração.
+
+    Cada escrita renova o prazo da chave e a move para o fim da fila.
+    Como o TTL é igual para todas as chaves, a ordem de inserção é
+    também a ordem de expiração: a limpeza só olha o início da fila
+    (O(1) amortizado) e acontece a cada acesso, sem task em background.
+    Ao exceder maxsize, a entrada mais antiga é descartada.
+
+    Atenção: mutar o valor in-place (ex: dict interno) não renova o
+    prazo — reatribua a chave para isso.
+
+    Args:
+        maxsize: Número máximo de entradas.
+        ttl: Tempo de vida de cada entrada, em segundos.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # {chave: (expira_em, valor)}, em ordem de expiração
+        self._data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        """Remove do início da fila as entradas já expiradas."""
+        data = self._data
+        while data:
+            expires_at, _ = next(iter(data.values()))
+            if expires_at > now:
+                break
+            data.popitem(last=False)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        now = time.monotonic()
+        self._expire(now)
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __getitem__(self, key: Any) -> Any:
+        self._expire(time.monotonic())
+        return self._data[key][1]
+
+    def __contains__(self, key: Any) -> bool:
+        self._expire(time.monotonic())
+        return key in self._data
+
+    def __len__(self) -> int:
+        self._expire(time.monotonic())
+        return len(self._data)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Retorna o valor da chave, ou default se ausente/expirada."""
+        self._expire(time.monotonic())
+        entry = self._data.get(key)
+        return default if entry is None else entry[1]
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        """Remove e retorna o valor da chave (mesma semântica de dict.pop)."""
+        self._expire(time.monotonic())
+        if key in self._data:
+            return self._data.pop(key)[1]
+        if default:
+            return default[0]
+        raise KeyError(key)
@@ -12,19 +12,37 @@ silenciosamente depois.
 Uso:
     from config.settings import settings
     print(settings.TELEGRAM_BOT_TOKEN)
+
+    # No caminho quente (uma vez por mensagem):
+    from config.settings import MAX_AUDIO_SIZE_BYTES
 """
 
+from __future__ import annotations
+
 import os
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import NoReturn
+
+# .env na raiz do projeto (desenvolvimento local)
+_ENV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+
+# Carrega .env apenas se existir. Em produção as vars vêm do ambiente
+# e não há .env: nem o python-dotenv é importado nem a árvore de
+# diretórios é percorrida procurando o arquivo.
+if os.path.isfile(_ENV_FILE):
+    from dotenv import load_dotenv
 
-from dotenv import load_dotenv
+    load_dotenv(_ENV_FILE, override=False)
 
-# Carrega .env apenas se existir (em produção, vars vêm do ambiente)
-load_dotenv()
+# Backends de transcrição suportados
+WHISPER_BACKENDS = ("openai", "local")
 
+# Variáveis de ambiente sem as quais o bot não inicia
+REQUIRED_VARS = ("TELEGRAM_BOT_TOKEN", "OPENAI_API_KEY", "BOT_PASSWORD")
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class Settings:
     """
     Configurações imutáveis do bot.
@@ -35,8 +53,20 @@ class Settings:
         BOT_PASSWORD: Senha para autenticação de usuários.
         MAX_AUDIO_SIZE_MB: Tamanho máximo de áudio em MB (padrão: 25).
         WHISPER_TEMPERATURE: Temperatura do Whisper (0 = máxima precisão).
+        WHISPER_BACKEND: "openai" (API Whisper) ou "local" (faster-whisper
+                         no próprio processo, sem custo por minuto).
+        WHISPER_MODEL_SIZE: Modelo do faster-whisper (tiny, base, small,
+                            medium, large-v3). Só usado no backend "local".
+        WHISPER_MAX_CONCURRENCY: Máximo de transcrições simultâneas
+                                 (protege a API/CPU em rajadas de áudios).
+        PORT: Porta do servidor de health check (o PaaS define via $PORT).
+        METRICS_TOKEN: Token exigido em GET /metrics (header
+                       "Authorization: Bearer <token>"). Vazio = /metrics
+                       desativado.
         DATA_DIR: Diretório para dados persistentes (authorized_users.json).
         TEMP_DIR: Diretório para arquivos temporários de áudio.
+        max_audio_size_bytes: MAX_AUDIO_SIZE_MB em bytes (calculado uma
+                              vez, para comparação direta).
     """
 
     TELEGRAM_BOT_TOKEN: str
@@ -44,13 +74,80 @@ class Settings:
     BOT_PASSWORD: str
     MAX_AUDIO_SIZE_MB: int = 25
     WHISPER_TEMPERATURE: float = 0.0
+    WHISPER_BACKEND: str = "openai"
+    WHISPER_MODEL_SIZE: str = "small"
+    WHISPER_MAX_CONCURRENCY: int = 4
+    PORT: int = 8080
+    METRICS_TOKEN: str = ""
     DATA_DIR: str = "data"
     TEMP_DIR: str = "temp"
+    max_audio_size_bytes: int = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Derivado de MAX_AUDIO_SIZE_MB; frozen impede atribuição direta
+        object.__setattr__(self, "max_audio_size_bytes", self.MAX_AUDIO_SIZE_MB * 1024 * 1024)
+
+
+def _fatal(message: str) -> NoReturn:
+    """Mostra um erro de configuração e encerra o processo (falha rápida)."""
+    print(f"❌ ERRO FATAL: {message}", file=sys.stderr)
+    sys.exit(1)
+
+
+def _env_int(env, name: str, default: str, minimum: int = 0, maximum: int | None = None) -> int:
+    """
+    Lê uma variável de ambiente inteira (só dígitos) dentro de um intervalo.
+
+    Args:
+        env: Mapeamento das variáveis (os.environ).
+        name: Nome da variável.
+        default: Valor usado se a variável não existir.
+        minimum: Menor valor aceito.
+        maximum: Maior valor aceito (None = sem limite).
+
+    Retorna:
+        O valor convertido.
 
-    @property
-    def max_audio_size_bytes(self) -> int:
-        """Retorna o tamanho máximo em bytes (para comparação direta)."""
-        return self.MAX_AUDIO_SIZE_MB * 1024 * 1024
+    Raises:
+        SystemExit: Se o valor não for um inteiro ou estiver fora do intervalo.
+    """
+    raw = env.get(name, default).strip()
+    # isdecimal (e não isdigit): "²" é dígito, mas int() o rejeita
+    if not raw.isdecimal():
+        _fatal(f"{name} deve ser um número inteiro (recebido: {raw!r}).")
+    value = int(raw)
+    if value < minimum or (maximum is not None and value > maximum):
+        limit = f"estar entre {minimum} e {maximum}" if maximum is not None else f"ser no mínimo {minimum}"
+        _fatal(f"{name} deve {limit} (recebido: {value}).")
+    return value
+
+
+def _env_float(env, name: str, default: str, minimum: float, maximum: float) -> float:
+    """
+    Lê uma variável de ambiente numérica (ex: "0", "0.2") dentro de um intervalo.
+
+    Args:
+        env: Mapeamento das variáveis (os.environ).
+        name: Nome da variável.
+        default: Valor usado se a variável não existir.
+        minimum: Menor valor aceito.
+        maximum: Maior valor aceito.
+
+    Retorna:
+        O valor convertido.
+
+    Raises:
+        SystemExit: Se o valor não for um número ou estiver fora do intervalo.
+    """
+    raw = env.get(name, default).strip()
+    try:
+        value = float(raw)
+    except ValueError:
+        _fatal(f"{name} deve ser um número (recebido: {raw!r}).")
+    # A comparação também rejeita nan (nunca está dentro do intervalo) e inf
+    if not minimum <= value <= maximum:
+        _fatal(f"{name} deve estar entre {minimum:g} e {maximum:g} (recebido: {raw!r}).")
+    return value
 
 
 def _load_settings() -> Settings:
@@ -61,39 +158,52 @@ def _load_settings() -> Settings:
         Settings: Objeto imutável com todas as configurações.
 
     Raises:
-        SystemExit: Se alguma variável obrigatória estiver ausente.
+        SystemExit: Se alguma variável obrigatória estiver ausente ou
+                    alguma opcional tiver valor inválido.
     """
+    env = os.environ
+
     # --- Variáveis obrigatórias ---
-    required_vars = {
-        "TELEGRAM_BOT_TOKEN": os.getenv("TELEGRAM_BOT_TOKEN"),
-        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),
-        "BOT_PASSWORD": os.getenv("BOT_PASSWORD"),
-    }
-
-    # Verifica se todas estão presentes
-    missing = [name for name, value in required_vars.items() if not value]
+    missing = [name for name in REQUIRED_VARS if not env.get(name)]
     if missing:
-        print(
-            f"❌ ERRO FATAL: Variáveis de ambiente obrigatórias não configuradas: "
+        _fatal(
+            f"Variáveis de ambiente obrigatórias não configuradas: "
             f"{', '.join(missing)}\n"
             f"   → Configure no arquivo .env (local) ou nos secrets do Railway.\n"
-            f"   → Veja .env.example para referência.",
-            file=sys.stderr,
+            f"   → Veja .env.example para referência."
         )
-        sys.exit(1)
 
     # --- Variáveis opcionais (com valores padrão) ---
-    max_size = int(os.getenv("MAX_AUDIO_SIZE_MB", "25"))
-    temperature = float(os.getenv("WHISPER_TEMPERATURE", "0"))
+    max_size = _env_int(env, "MAX_AUDIO_SIZE_MB", "25", minimum=1)
+    temperature = _env_float(env, "WHISPER_TEMPERATURE", "0", minimum=0.0, maximum=1.0)
+    backend = env.get("WHISPER_BACKEND", "openai").strip().lower()
+    model_size = env.get("WHISPER_MODEL_SIZE", "small").strip()
+    max_concurrency = _env_int(env, "WHISPER_MAX_CONCURRENCY", "4", minimum=1)
+    port = _env_int(env, "PORT", "8080", minimum=1, maximum=65535)
+
+    if backend not in WHISPER_BACKENDS:
+        _fatal(
+            f"WHISPER_BACKEND inválido: '{backend}'\n"
+            f"   → Valores aceitos: {', '.join(WHISPER_BACKENDS)}."
+        )
 
     return Settings(
-        TELEGRAM_BOT_TOKEN=required_vars["TELEGRAM_BOT_TOKEN"],
-        OPENAI_API_KEY=required_vars["OPENAI_API_KEY"],
-        BOT_PASSWORD=required_vars["BOT_PASSWORD"],
+        TELEGRAM_BOT_TOKEN=env["TELEGRAM_BOT_TOKEN"],
+        OPENAI_API_KEY=env["OPENAI_API_KEY"],
+        BOT_PASSWORD=env["BOT_PASSWORD"],
         MAX_AUDIO_SIZE_MB=max_size,
         WHISPER_TEMPERATURE=temperature,
+        WHISPER_BACKEND=backend,
+        WHISPER_MODEL_SIZE=model_size,
+        WHISPER_MAX_CONCURRENCY=max_concurrency,
+        PORT=port,
+        METRICS_TOKEN=env.get("METRICS_TOKEN", "").strip(),
     )
 
 
 # Singleton: carregado uma única vez no import
 settings = _load_settings()
+
+# Valores lidos em toda mensagem, expostos também como constantes do
+# módulo (Settings é imutável, então nunca divergem do singleton)
+MAX_AUDIO_SIZE_BYTES = settings.max_audio_size_bytes
@@ -20,13 +20,78 @@ Para rodar:
     Configurado automaticamente via railway.toml
 """
 
+import asyncio
+import hmac
 import logging
 import sys
 
-from telegram.ext import Application
+from bot import metrics
 
-from bot.handlers import setup_handlers
-from config.settings import settings
+logger = logging.getLogger(__name__)
+
+# Libs externas com log reduzido a warnings+ (só ruído em INFO)
+QUIET_LOGGERS = ("httpx", "httpcore", "openai", "telegram")
+
+# Máximo de updates do Telegram processados ao mesmo tempo
+CONCURRENT_UPDATES = 32
+
+# Long polling: o Telegram segura cada getUpdates por até este tempo
+# (segundos) e responde assim que chega uma mensagem. Bot ocioso faz
+# uma requisição a cada ~50s; a latência não depende deste valor.
+LONG_POLL_TIMEOUT = 50
+
+# Respostas do servidor de health check, montadas uma única vez.
+# Headers e corpo separados: HEAD recebe só os headers
+HEALTH_BODY = b"Bot is running!"
+HEALTH_RESPONSE_HEAD = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Length: %d\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+) % len(HEALTH_BODY)
+METRICS_RESPONSE_HEAD = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/plain; version=0.0.4\r\n"
+    b"Content-Length: %d\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+NOT_FOUND_RESPONSE_HEAD = (
+    b"HTTP/1.1 404 Not Found\r\n"
+    b"Content-Length: 0\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+# Tempo máximo (segundos) para o cliente do health check enviar a requisição
+HEALTH_READ_TIMEOUT = 5.0
+
+# Servidor do health check (criado em start_health_check_server)
+_health_server: asyncio.Server | None = None
+
+# Valor esperado no header Authorization de /metrics (b"Bearer <token>").
+# None = /metrics desativado (METRICS_TOKEN vazio)
+_metrics_authorization: bytes | None = None
+
+
+class _LogFormatter(logging.Formatter):
+    """
+    Formatter que formata a data/hora (asctime) no máximo uma vez por segundo.
+
+    O formato não tem milissegundos, então todos os registros do mesmo
+    segundo têm o mesmo texto: strftime só roda quando o segundo muda.
+    """
+
+    _cached_second = -1
+    _cached_asctime = ""
+
+    def formatTime(self, record: logging.LogRecord, datefmt: str | None = None) -> str:
+        second = int(record.created)
+        if second != self._cached_second:
+            self._cached_asctime = super().formatTime(record, datefmt)
+            self._cached_second = second
+        return self._cached_asctime
 
 
 def setup_logging() -> None:
@@ -44,51 +109,132 @@ def setup_logging() -> None:
 
     Em produção (Railway), logs aparecem no dashboard automaticamente.
     """
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s | %(levelname)-7s | %(name)s | %(message)s",
+    # O formato não usa thread/processo: não coletar em cada registro
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_LogFormatter(
+        "%(asctime)s | %(levelname)-7s | %(name)s | %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-        ],
-    )
+    ))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
 
     # Reduz ruído de libs externas (só mostra warnings+)
-    logging.getLogger("httpx").setLevel(logging.WARNING)
-    logging.getLogger("httpcore").setLevel(logging.WARNING)
-    logging.getLogger("openai").setLevel(logging.WARNING)
-    logging.getLogger("telegram").setLevel(logging.WARNING)
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+async def _handle_health_check(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Responde uma conexão do health check.
+
+    Lê a requisição até o fim dos headers sem interpretá-la (só o
+    método e o caminho da primeira linha importam: /metrics ou não,
+    HEAD ou não) e responde com bytes prontos. Só /metrics olha os
+    headers, para conferir o token.
+    """
+    try:
+        request = await asyncio.wait_for(
+            reader.readuntil(b"\r\n\r\n"), HEALTH_READ_TIMEOUT
+        )
+
+        method, _, rest = request.partition(b" ")
+        path = rest.partition(b" ")[0]
+
+        # /metrics: contadores e latências no formato Prometheus. A porta
+        # é pública, então exige token; sem ele, responde como inexistente
+        if path == b"/metrics":
+            if _metrics_authorized(request):
+                body = metrics.render().encode()
+                head = METRICS_RESPONSE_HEAD % len(body)
+            else:
+                head, body = NOT_FOUND_RESPONSE_HEAD, b""
+        else:
+            head, body = HEALTH_RESPONSE_HEAD, HEALTH_BODY
+
+        # HEAD: mesmos headers (inclusive Content-Length), sem corpo
+        writer.write(head if method == b"HEAD" else head + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        pass  # cliente lento, incompleto ou que desconectou: só fecha
+    finally:
+        writer.close()
+
+
+def _metrics_authorized(request: bytes) -> bool:
+    """
+    Confere o header Authorization da requisição com METRICS_TOKEN.
 
+    Args:
+        request: Linha de requisição e headers, em bytes.
 
-def start_health_check_server() -> None:
+    Retorna:
+        True se o token confere (comparação em tempo constante).
+    """
+    if _metrics_authorization is None:
+        return False
+
+    for line in request.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"authorization":
+            return hmac.compare_digest(value.strip(), _metrics_authorization)
+
+    return False
+
+
+async def start_health_check_server(application) -> None:
     """
     Inicia um servidor HTTP simples para satisfazer o health check do Render.
     
     O Render (e outros PaaS) exige que serviços web escutem em uma porta.
     Como este bot usa polling (não webhook), criamos este servidor dummy
     apenas para responder "200 OK" e manter o serviço vivo.
+
+    Também expõe GET /metrics (formato Prometheus, ver bot/metrics.py),
+    só com o token de METRICS_TOKEN — a porta é pública.
+
+    Registrado como post_init do Application: o servidor roda no mesmo
+    event loop do polling, sem thread própria.
     """
-    import os
-    from http.server import BaseHTTPRequestHandler, HTTPServer
-    from threading import Thread
-
-    class HealthCheckHandler(BaseHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.end_headers()
-            self.wfile.write(b"Bot is running!")
-        
-        # Silencia logs de requisição para não poluir o terminal
-        def log_message(self, format, *args):
-            pass
-
-    port = int(os.getenv("PORT", 8080))
-    server = HTTPServer(("0.0.0.0", port), HealthCheckHandler)
-    
-    thread = Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    
-    logging.getLogger(__name__).info(f"🌍 Health check server rodando na porta {port}")
+    global _health_server, _metrics_authorization
+
+    from config.settings import settings
+
+    if settings.METRICS_TOKEN:
+        _metrics_authorization = b"Bearer " + settings.METRICS_TOKEN.encode()
+
+    _health_server = await asyncio.start_server(_handle_health_check, "0.0.0.0", settings.PORT)
+
+    logger.info("🌍 Health check server rodando na porta %d", settings.PORT)
+
+
+async def stop_health_check_server() -> None:
+    """
+    Fecha o servidor de health check no encerramento do bot.
+
+    No SIGTERM do deploy, a porta é fechada de forma limpa (FIN) em
+    vez de sumir junto com o processo.
+    """
+    if _health_server is not None:
+        _health_server.close()
+        await _health_server.wait_closed()
+
+
+async def shutdown(application) -> None:
+    """
+    Libera os recursos do bot (registrado como post_shutdown).
+
+    Para os workers de transcrição, fecha o pool HTTP da OpenAI e o
+    servidor de health check.
+    """
+    from bot.handlers import stop_workers
+    from bot.transcription import close_client
+
+    await stop_workers()
+    await close_client()
+    await stop_health_check_server()
 
 
 def main() -> None:
@@ -97,37 +243,53 @@ def main() -> None:
 
     Etapas:
         1. Configura logging
-        2. Inicia servidor dummy (para Render/Railway)
-        3. Verifica configurações (falha rápido se algo estiver errado)
-        4. Cria instância do bot
-        5. Registra handlers
-        6. Inicia polling (loop infinito de escuta)
+        2. Verifica configurações (falha rápido se algo estiver errado)
+        3. Cria instância do bot
+        4. Registra handlers
+        5. Inicia servidor dummy (para Render/Railway) e o polling
+           (loop infinito de escuta)
     """
     # 1. Configura logging
     setup_logging()
-    logger = logging.getLogger(__name__)
+
+    # Imports pesados (telegram, openai, settings) só depois do logging:
+    # importar main.py fica barato e um erro de import/configuração já
+    # sai no formato de log
+    from telegram.ext import Application
+
+    from bot.auth import preload_authorized_users
+    from bot.handlers import setup_handlers
+    from config.settings import settings
 
     logger.info("=" * 50)
     logger.info("🎙️ Bot de Transcrição de Áudio — Iniciando")
     logger.info("=" * 50)
 
-    # 2. Inicia servidor de health check (necessário para deploy gratuito)
-    start_health_check_server()
-
-    # 3. Verifica configurações (sem expor chaves!)
-    logger.info(f"📏 Tamanho máximo de áudio: {settings.MAX_AUDIO_SIZE_MB}MB")
-    logger.info(f"🎯 Temperatura Whisper: {settings.WHISPER_TEMPERATURE}")
-    logger.info(f"📂 Diretório de dados: {settings.DATA_DIR}")
-    logger.info(f"📂 Diretório temporário: {settings.TEMP_DIR}")
+    # 2. Verifica configurações (sem expor chaves!)
+    logger.info("📏 Tamanho máximo de áudio: %dMB", settings.MAX_AUDIO_SIZE_MB)
+    logger.info("🎯 Temperatura Whisper: %s", settings.WHISPER_TEMPERATURE)
+    logger.info("🧵 Transcrições simultâneas: %d", settings.WHISPER_MAX_CONCURRENCY)
+    logger.info("📂 Diretório de dados: %s", settings.DATA_DIR)
+    logger.info("📂 Diretório temporário: %s", settings.TEMP_DIR)
+    logger.info("🔐 Usuários autorizados: %d", preload_authorized_users())
 
     # 3. Cria o Application do python-telegram-bot
     #    - Application é a classe principal que gerencia o bot
     #    - .builder() usa o pattern Builder para configuração
     #    - .token() configura o token de autenticação
     #    - .build() cria a instância final (imutável)
+    #    - .concurrent_updates() processa updates de chats diferentes em
+    #      paralelo (o padrão é um por vez); a etapa cara (Whisper) tem
+    #      seu próprio limite em WHISPER_MAX_CONCURRENCY
+    #    - .post_init() sobe o servidor de health check (necessário para
+    #      deploy gratuito) no event loop do bot, antes do polling;
+    #      .post_shutdown() o fecha (e para os workers) quando o bot encerra
     application = (
         Application.builder()
         .token(settings.TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(start_health_check_server)
+        .post_shutdown(shutdown)
         .build()
     )
 
@@ -135,14 +297,16 @@ def main() -> None:
     setup_handlers(application)
 
     # 5. Inicia polling (loop infinito)
-    #    - poll_interval=1.0: verifica novas mensagens a cada 1s
+    #    - timeout: duração de cada long poll (ver LONG_POLL_TIMEOUT)
+    #    - poll_interval=0: sem pausa entre um getUpdates e o próximo
+    #      (a espera já acontece no servidor do Telegram)
     #    - drop_pending_updates=True: ignora mensagens antigas no startup
-    #    - allowed_updates: tipos de updates a receber
     logger.info("🚀 Bot iniciado! Aguardando mensagens...")
     logger.info("   Pressione Ctrl+C para parar")
 
     application.run_polling(
-        poll_interval=1.0,
+        timeout=LONG_POLL_TIMEOUT,
+        poll_interval=0.0,
         drop_pending_updates=True,
     )
 